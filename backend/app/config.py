@@ -4,10 +4,109 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Digital Empire"
     DATABASE_URL: str = "sqlite:///./empire.db"
+    DATABASE_ASYNC_URL: str = ""  # request handlers' asyncio URL; derived from DATABASE_URL when empty
+
+    # SQLite tuning - "production" applies WAL + the pragmas below on every connection
+    SQLITE_PROFILE: str = "production"    # or "default" for SQLite's stock settings
+    SQLITE_MMAP_SIZE: int = 268435456     # bytes of the file memory-mapped (256 MB)
+    SQLITE_CACHE_SIZE: int = -65536       # page cache; negative = KiB (64 MB)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Read/write routing - public GETs use the read engine (a replica, or just a
+    # separate pool on the primary), everything else the primary
+    DATABASE_READ_URL: str = ""           # empty = read from the primary
+    DB_POOL_SIZE: int = 8                 # primary (write) pool, per engine
+    DB_POOL_OVERFLOW: int = 8
+    DB_READ_POOL_SIZE: int = 16
+    DB_READ_POOL_OVERFLOW: int = 16
+    DB_READ_PIN_SECONDS: float = 5.0      # an admin's reads go to the primary this long after their write
+
+    # Blog view counts are buffered in memory and written in batches
+    BLOG_VIEW_FLUSH_INTERVAL: float = 10.0  # seconds between flushes
+    BLOG_VIEW_SHARDS: int = 16
     SECRET_KEY: str = "your-secret-key-change-this"
     GROQ_API_KEY: str = ""
     ADMIN_TOKEN: str = "fallback-token-12345"  # Add this line
 
+    # AI chat upstream - "groq" or "stub" (offline, for load tests)
+    CHAT_PROVIDER: str = "groq"
+
+    # Groq HTTP client tuning
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    CHAT_CONNECT_TIMEOUT: float = 5.0     # seconds to establish a connection
+    CHAT_READ_TIMEOUT: float = 30.0       # seconds to wait between bytes from upstream
+    CHAT_MAX_RETRIES: int = 2
+    CHAT_MAX_CONNECTIONS: int = 20        # pooled connections per worker
+    CHAT_MAX_KEEPALIVE: int = 10          # idle keep-alive connections kept open
+    CHAT_KEEPALIVE_EXPIRY: float = 30.0   # seconds an idle connection is kept
+
+    # Circuit breaker around the upstream - trips on errors or slow answers
+    CHAT_FALLBACK_MODEL: str = "llama-3.1-8b-instant"  # used while the circuit is open ("" = canned reply)
+    CHAT_UPSTREAM_TIMEOUT: float = 12.0   # seconds to a full answer / the first streamed token
+    CHAT_BREAKER_WINDOW: int = 20         # recent calls considered
+    CHAT_BREAKER_MIN_CALLS: int = 5
+    CHAT_BREAKER_ERROR_RATE: float = 0.5  # open at this share of failed calls
+    CHAT_BREAKER_LATENCY_MS: float = 8000.0  # ...or when p95 latency exceeds this
+    CHAT_BREAKER_OPEN_SECONDS: float = 30.0  # before a half-open probe
+
+    # Stub provider timing and fault injection (CHAT_PROVIDER=stub)
+    STUB_LATENCY_MS: float = 400.0        # delay before the first token
+    STUB_TOKENS_PER_SEC: float = 60.0
+    STUB_RESPONSE_TOKENS: int = 120
+    STUB_ERROR_RATE: float = 0.0          # 0..1 share of calls that fail
+    STUB_SEED: int = 0
+
+    # Streaming - chunks buffered per connection before upstream reads pause
+    CHAT_STREAM_QUEUE_SIZE: int = 64
+    # Coalesce token deltas into fewer frames: flush after this window or size
+    CHAT_STREAM_COALESCE_MS: float = 40.0   # 0 sends every delta as its own frame
+    CHAT_STREAM_COALESCE_BYTES: int = 512
+    # Server-Sent Events endpoint
+    CHAT_SSE_HEARTBEAT: float = 15.0      # seconds of silence before a ping comment
+    CHAT_SSE_RESUME_TTL: float = 120.0    # seconds a reply stays resumable
+    CHAT_SSE_MAX_STREAMS: int = 1000
+
+    # Conversation history cache - rolling window of recent turns per session
+    CHAT_HISTORY_TURNS: int = 10
+    CHAT_HISTORY_CACHE_SESSIONS: int = 1000
+    CHAT_HISTORY_TTL: float = 1800.0      # seconds an idle session stays cached
+
+    # Prompt context budget (estimated tokens for system + history + message)
+    CHAT_CONTEXT_BUDGET: int = 3000
+    CHAT_CONTEXT_RECENT_TURNS: int = 2    # newest turns always sent verbatim
+    CHAT_CONTEXT_COMPACT_TOKENS: int = 200  # per-message cap for older turns
+
+    # Response cache for repeated opening questions
+    CHAT_CACHE_SIZE: int = 500
+    CHAT_CACHE_TTL: float = 3600.0
+    CHAT_CACHE_MAX_HISTORY_TURNS: int = 0  # only cache prompts with at most this many prior turns
+
+    # Retrieval grounding - snippets from projects/blog/resume added to the prompt
+    CHAT_RETRIEVAL_TOP_K: int = 4
+    CHAT_RETRIEVAL_SNIPPET_CHARS: int = 500
+    CHAT_RETRIEVAL_REFRESH_INTERVAL: float = 300.0  # seconds between rebuilds; 0 disables
+
+    # Admission control - shed overload before it reaches the upstream
+    CHAT_MAX_CONCURRENT: int = 8          # upstream calls in flight per worker
+    CHAT_MAX_QUEUE: int = 32              # requests allowed to wait for a slot
+    CHAT_QUEUE_TIMEOUT: float = 10.0      # seconds a queued request may wait
+    CHAT_SESSION_RATE: float = 0.2        # messages/second per session (token refill)
+    CHAT_SESSION_BURST: float = 5
+    CHAT_IP_RATE: float = 0.5             # messages/second per client IP
+    CHAT_IP_BURST: float = 15
+    CHAT_RATE_BUCKETS: int = 10000        # tracked sessions/IPs (LRU)
+
+    # Write-behind persistence of chat turns
+    CHAT_WRITE_BATCH: int = 50            # max rows per transaction
+    CHAT_WRITE_INTERVAL: float = 0.5      # seconds to gather a batch
+    CHAT_WRITE_QUEUE: int = 2000          # pending rows before handlers wait
+
+    # Chat retention - sessions idle this long are archived and deleted
+    CHAT_RETENTION_DAYS: int = 90         # 0 keeps everything
+    CHAT_RETENTION_INTERVAL: float = 3600.0  # seconds between runs
+    CHAT_RETENTION_BATCH: int = 500       # rows archived/deleted per transaction
+    CHAT_ARCHIVE_DIR: str = "./archive/chat"
+
 
     class Config:
         env_file = ".env"
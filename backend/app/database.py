@@ -1,24 +1,251 @@
-from sqlalchemy import create_engine
+import math
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Request, Response
 from .config import settings
+from .utils.ttl_cache import TTLCache
+
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas() -> dict:
+    """Per-connection pragmas of the production SQLite profile"""
+    if settings.SQLITE_PROFILE != "production":
+        return {}
+    return {
+        # Readers no longer wait for writers (and vice versa)
+        "journal_mode": "WAL",
+        # Durable at checkpoints; safe against corruption in WAL mode
+        "synchronous": "NORMAL",
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        # Wait for a lock instead of failing with "database is locked"
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": "MEMORY",
+    }
+
+
+def _install_sqlite_pragmas(sync_engine: Engine):
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
 
-# Create database engine
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def engine_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """Pooling suited to the database behind `url`"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and not is_sqlite_file(url):
+        return {}  # in-memory databases use a single shared connection
+    options = {"pool_size": pool_size, "max_overflow": max_overflow}
+    if is_sqlite_file(url):
+        # SQLite connections are cheap but carry their page cache and mmap,
+        # so keep them open for the life of the process instead of recycling
+        options["pool_recycle"] = -1
+    return options
+
+
+# Create database engine (sync - used by background jobs on worker threads)
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **engine_options(settings.DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_POOL_OVERFLOW),
 )
 
 # Create  a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """The same database through its asyncio driver (aiosqlite / asyncpg)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in parsed.query:
+            parsed = parsed.update_query_dict({"ssl": parsed.query["sslmode"]}).difference_update_query(["sslmode"])
+        return parsed.render_as_string(hide_password=False)
+    return url
+
+
+class WriteSession(Session):
+    """Sessions on the primary; they note when they change data.
+
+    A callable in info["on_write"] runs after each commit that changed something.
+    """
+
+
+@event.listens_for(WriteSession, "after_flush")
+def _note_flush(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["wrote"] = True
+
+
+@event.listens_for(WriteSession, "do_orm_execute")
+def _note_statement(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(WriteSession, "after_commit")
+def _after_write_commit(session):
+    if session.info.pop("wrote", False):
+        on_write: Optional[Callable] = session.info.get("on_write")
+        if on_write:
+            on_write()
+
+
+@event.listens_for(WriteSession, "after_rollback")
+def _after_write_rollback(session):
+    session.info.pop("wrote", None)
+
+
+# Async engines for request handlers - queries no longer block the event loop.
+# Writes (and admin reads) use the primary; public reads their own pool,
+# optionally on a replica
+_async_url = settings.DATABASE_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url, **engine_options(_async_url, settings.DB_POOL_SIZE, settings.DB_POOL_OVERFLOW)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, sync_session_class=WriteSession)
+
+READ_DATABASE_URL = settings.DATABASE_READ_URL or settings.DATABASE_URL
+_read_async_url = async_database_url(READ_DATABASE_URL) if settings.DATABASE_READ_URL else _async_url
+read_engine = create_async_engine(
+    _read_async_url, **engine_options(_read_async_url, settings.DB_READ_POOL_SIZE, settings.DB_READ_POOL_OVERFLOW)
+)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+
+if is_sqlite_file(settings.DATABASE_URL):
+    _install_sqlite_pragmas(engine)
+    _install_sqlite_pragmas(async_engine.sync_engine)
+if is_sqlite_file(READ_DATABASE_URL):
+    _install_sqlite_pragmas(read_engine.sync_engine)
+
+
+class ReadYourWrites:
+    """Sends a client's reads to the primary for a short window after their admin write.
+
+    A replica may lag behind the primary; pinning keeps an admin from
+    reloading a page and seeing the state before their own change, without
+    moving anyone else's reads. Clients are recognised by a short-lived
+    cookie (honoured by every worker) or, when cookies aren't sent back
+    (cross-origin fetch without credentials), by address within this worker.
+    """
+
+    COOKIE = "db_read_primary"
+
+    def __init__(self, seconds: float, clients: int = 10000):
+        self.seconds = seconds
+        self._clients = TTLCache(maxsize=clients, ttl=seconds)
+
+    @staticmethod
+    def _client(request: Request) -> Optional[str]:
+        return request.client.host if request.client else None
+
+    def pin(self, request: Request, response: Response):
+        client = self._client(request)
+        if client:
+            self._clients.set(client, True)
+        response.set_cookie(self.COOKIE, "1", max_age=math.ceil(self.seconds), httponly=True, samesite="lax")
+
+    def pinned(self, request: Request) -> bool:
+        if self.COOKIE in request.cookies:
+            return True
+        client = self._client(request)
+        return client is not None and self._clients.get(client, False)
+
+
+read_your_writes = ReadYourWrites(settings.DB_READ_PIN_SECONDS)
+
 # Base class for models
 Base = declarative_base()
 
-# Dependency for routes
-def get_db():
-    db= SessionLocal()
-    try:
+# Dependencies for routes
+async def get_write_db():
+    """Session on the primary (public writes like feedback - never pins reads)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_admin_db(request: Request, response: Response):
+    """Session on the primary for admin-token routes; a committed change pins
+    this client's reads to the primary (read-your-writes)"""
+    async with AsyncSessionLocal() as db:
+        db.info["on_write"] = lambda: read_your_writes.pin(request, response)
+        yield db
+
+async def get_read_db(request: Request):
+    """Session for public reads - the read engine unless this client is pinned to the primary"""
+    factory = AsyncSessionLocal if read_your_writes.pinned(request) else ReadSessionLocal
+    async with factory() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def create_missing_indexes():
+    """Create indexes added to models after their tables already existed.
+
+    create_all() skips existing tables entirely, so new indexes on them would
+    otherwise never be built.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def create_missing_columns():
+    """Add nullable columns added to models after their tables already existed.
+
+    There are no migrations; create_all() leaves existing tables as they are.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    print(f"❌ Column {table.name}.{column.name} is missing and NOT NULL - add it manually")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                print(f"🗄️  Added column {table.name}.{column.name}")
+
+def log_database_settings():
+    """Print the effective connection settings (startup check)"""
+    if settings.DATABASE_READ_URL:
+        print(f"🗄️  Public reads routed to {make_url(READ_DATABASE_URL).render_as_string(hide_password=True)}")
+    if not is_sqlite_file(settings.DATABASE_URL):
+        print(f"🗄️  Database: {engine.dialect.name}, pool size {engine.pool.size()}")
+        return
+    with engine.connect() as connection:
+        effective = {
+            name: connection.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "temp_store")
+        }
+    summary = ", ".join(f"{name}={value}" for name, value in effective.items())
+    print(f"🗄️  SQLite ({settings.SQLITE_PROFILE} profile): {summary}, pool size {engine.pool.size()}")
+    if settings.SQLITE_PROFILE == "production" and str(effective["journal_mode"]).lower() != "wal":
+        print("❌ SQLite WAL mode could not be enabled - readers will block behind writes")
@@ -1,24 +1,99 @@
 import os
+import asyncio
+import importlib
+import time
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from sqlalchemy.orm import Session
 import uvicorn
 
-from .database import get_db, engine, Base
+from .config import settings
+from .database import (
+    engine, async_engine, read_engine, Base, create_missing_columns, create_missing_indexes, log_database_settings,
+)
 from .models.project import Project
 from .routers import chatbot
 from .routes import admin, blog, resume, projects
+from .services import blog_render, blog_search, chat_analytics
+from .services.ai_chat import ChatServiceUnavailable, close_ai_chat_service, get_ai_chat_service
+from .services.chat_retention import chat_retention
+from .services.chat_writer import chat_writer
+from .services.retrieval import retrieval_index
+from .services.view_counter import view_counter
+
+
+@contextmanager
+def startup_timer(subsystem: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"⏱️  {subsystem} ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+async def warm_up_chat():
+    """Initialize the chat provider in the background so boot isn't blocked on it"""
+    start = time.perf_counter()
+    try:
+        if settings.CHAT_PROVIDER == "groq":
+            # Heavy SDK import off the event loop
+            await asyncio.to_thread(importlib.import_module, "groq")
+        get_ai_chat_service()
+        print(f"⏱️  chat service ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except ChatServiceUnavailable:
+        # Logged by the service; other APIs keep working and chat retries on use
+        pass
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_timer("database"):
+        # Create database tables
+        Base.metadata.create_all(bind=engine)
+        create_missing_columns()
+        create_missing_indexes()
+        log_database_settings()
+        await asyncio.to_thread(blog_search.setup)
+        await asyncio.to_thread(blog_render.backfill)
+        await asyncio.to_thread(chat_analytics.backfill_if_empty)
+
+    with startup_timer("retrieval index"):
+        await asyncio.to_thread(retrieval_index.rebuild, resume.DEFAULT_RESUME_DATA)
+
+    chat_writer.start()
+    view_counter.start()
+    warm_up = asyncio.create_task(warm_up_chat())
+    retention = asyncio.create_task(chat_retention.run_forever()) if chat_retention.enabled else None
+    # The retrieval index is per process; catch up with edits made through other workers
+    refresh_interval = settings.CHAT_RETRIEVAL_REFRESH_INTERVAL
+    retrieval_refresh = asyncio.create_task(
+        retrieval_index.refresh_forever(refresh_interval, resume.DEFAULT_RESUME_DATA)
+    ) if refresh_interval > 0 else None
+    yield
+    warm_up.cancel()
+    if retention:
+        retention.cancel()
+    if retrieval_refresh:
+        retrieval_refresh.cancel()
+    # Flush chat turns still waiting in the write-behind queue
+    await chat_writer.stop()
+    # ...and blog views not yet added to the database
+    await view_counter.stop()
+    # Release pooled keep-alive connections to the AI upstream
+    await close_ai_chat_service()
+    await async_engine.dispose()
+    await read_engine.dispose()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Digital Empire API - Amal Madhu",
     description="Backend API for Amal Madhu's portfolio ecosystem with AI-powered features, resume management, and project showcase",
     version="2.0.0",
     docs_url=None,      # Disable default Swagger UI
-    redoc_url=None      # Disable default ReDoc
+    redoc_url=None,     # Disable default ReDoc
+    lifespan=lifespan
 )
 
 # Get environment
@@ -53,6 +128,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],  # the chat widget waits this long after a 429
 )
 
 # Include routers
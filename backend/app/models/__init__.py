@@ -1,4 +1,6 @@
 from .project import Project
 from .chat_message import ChatMessage
+from .llm_usage import LLMUsage
+from .chat_rollup import ChatRollup
 
-__all__ = ["Project", "ChatMessage"]
+__all__ = ["Project", "ChatMessage", "LLMUsage", "ChatRollup"]
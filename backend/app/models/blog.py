@@ -1,14 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index, JSON
 from sqlalchemy.sql import func
 from ..database import Base
 
 class BlogPost(Base):
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        # Public list: published posts, newest first, optionally per category;
+        # id breaks created_at ties so keyset cursors are exact
+        Index("ix_blog_posts_published_category_created", "published", "category", "created_at", "id"),
+        Index("ix_blog_posts_published_created", "published", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     slug = Column(String, unique=True, index=True)
     content = Column(Text, nullable=False)
+    # Rendered from content when an admin saves it (services/blog_render.py)
+    content_html = Column(Text)
+    toc = Column(JSON)                 # [{"id", "title", "level", "children"}]
+    read_time = Column(Integer)        # minutes
+    content_hash = Column(String(64))  # of content + renderer version
     excerpt = Column(String)
     author = Column(String, default="Your Name")
     category = Column(String)
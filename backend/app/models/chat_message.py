@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # History lookups filter by session and order by time
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     session_id = Column(String(100), nullable=False, index=True) # Track conversations
+    turn_id = Column(String(32), unique=True, index=True) # Assigned with the reply; clients vote by it
     is_useful = Column(Boolean, default=None) # User feedback
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint
+from ..database import Base
+
+class ChatRollup(Base):
+    """Pre-aggregated chat traffic per hour/day bucket (kept in step with chat_messages)"""
+    __tablename__ = "chat_rollups"
+    __table_args__ = (
+        # Upsert target, and the analytics endpoint reads the newest N buckets from it
+        UniqueConstraint("granularity", "bucket_start", name="uq_chat_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)   # "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    sessions = Column(Integer, nullable=False, default=0)   # sessions that started in the bucket
+    messages = Column(Integer, nullable=False, default=0)
+    useful = Column(Integer, nullable=False, default=0)
+    not_useful = Column(Integer, nullable=False, default=0)
+    response_chars = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ChatRollup {self.granularity} {self.bucket_start}>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Index
+from ..database import Base
+
+class LLMUsage(Base):
+    """Token usage and latency of the upstream call(s) behind a chat message"""
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        # Admin aggregates scan a recent time window
+        Index("ix_llm_usage_created_model", "created_at", "model"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_message_id = Column(Integer, ForeignKey("chat_messages.id", ondelete="CASCADE"), nullable=True, index=True)
+    model = Column(String(100), nullable=False)
+    ok = Column(Boolean, nullable=False, default=True)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    ttft_ms = Column(Float)       # time to first token (streaming only)
+    latency_ms = Column(Float)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<LLMUsage {self.model} message={self.chat_message_id}>"
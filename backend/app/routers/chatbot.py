@@ -1,16 +1,54 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from typing import List
+import os
+import asyncio
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
 import json
+from datetime import datetime, timedelta, timezone
 import uuid
 
-from ..database import get_db
+from ..config import settings
+from ..database import AsyncSessionLocal, get_read_db, get_write_db
 from ..models.chat_message import ChatMessage
-from ..services.ai_chat import ai_chat_service
+from ..models.llm_usage import LLMUsage
+from ..services import chat_analytics
+from ..services.admission import AdmissionRejected, admission
+from ..services.ai_chat import (
+    AIChatService,
+    ChatServiceUnavailable,
+    get_ai_chat_service,
+    peek_ai_chat_service,
+)
+from ..services.chat_retention import chat_retention
+from ..services.chat_writer import chat_writer
+from ..services.conversation_store import conversation_store
+from ..services.llm_metrics import llm_metrics, summarize
+from ..services.sse_streams import SSEStream, sse_streams
+from ..services.streaming import BufferedStream, StreamStats
 from pydantic import BaseModel
 
+# Load environment variables
+load_dotenv()
+
 router = APIRouter(prefix="/api/chat", tags=["chatbot"])
 
+# Admin token from environment variable
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "fallback-token-12345")
+
+def verify_admin(token: str):
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+def get_chat_service() -> AIChatService:
+    """Dependency: the lazily created chat service, or 503 if it can't start"""
+    try:
+        return get_ai_chat_service()
+    except ChatServiceUnavailable:
+        raise HTTPException(status_code=503, detail="Chat service is currently unavailable")
+
 class ChatRequest(BaseModel):
     message: str
     session_id: str = None
@@ -18,46 +56,84 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    turn_id: str  # for POST /feedback
+
+class FeedbackRequest(BaseModel):
+    turn_id: str
+    useful: bool
+
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many requests ({e.reason}). Please try again in a moment.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 @router.post("/message", response_model=ChatResponse)
-async def chat_message(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_message(
+    request: ChatRequest,
+    http_request: Request,
+    ai_chat_service: AIChatService = Depends(get_chat_service),
+):
     """Simple chat endpoint (non-streaming)"""
 
     # Generate session ID if not provided
     session_id = request.session_id or str(uuid.uuid4())
 
-    # Get conversation history from database
-    history = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at).limit(10).all()
-
-    # Convert to format AI expects
-    conversation_history = []
-    for msg in history:
-        conversation_history.append({"role": "user", "content": msg.user_message})
-        conversation_history.append({"role": "assistant", "content": msg.bot_response})
-
-    # Get AI response
-    ai_response = ai_chat_service.get_response(
-        user_message=request.message,
-        conversation_history=conversation_history
-    )
+    # Get recent conversation history (cached; DB only on a miss). The
+    # session is closed before the upstream call so no connection is held.
+    async with AsyncSessionLocal() as db:
+        conversation_history = await conversation_store.get_history(db, session_id)
 
-    # Save to database
-    chat_record = ChatMessage(
-        user_message=request.message,
-        bot_response=ai_response,
-        session_id=session_id
-    )
-    db.add(chat_record)
-    db.commit()
+    # Get AI response (awaited - upstream latency no longer blocks the event loop)
+    client_ip = http_request.client.host if http_request.client else None
+    try:
+        admission.check_rate(session_id, client_ip)
+        with llm_metrics.capture() as llm_calls:
+            ai_response = await ai_chat_service.get_response(
+                user_message=request.message,
+                conversation_history=conversation_history
+            )
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
+    # Save to database (batched in the background)
+    turn_id = uuid.uuid4().hex
+    conversation_store.append(session_id, request.message, ai_response)
+    await chat_writer.enqueue(request.message, ai_response, session_id, llm_calls, turn_id=turn_id)
+
+    return ChatResponse(response=ai_response, session_id=session_id, turn_id=turn_id)
+
+async def _reply_batches(ai_chat_service: AIChatService, user_message: str, conversation_history: List) -> AsyncIterator[Tuple[str, int]]:
+    """Stream AI response through a bounded buffer, coalesced into batches.
 
-    return ChatResponse(response=ai_response, session_id=session_id)
+    A slow client pauses upstream reads instead of piling chunks up in
+    memory, and single-token deltas are merged into fewer, larger frames.
+    """
+    source = ai_chat_service.get_streaming_response(user_message, conversation_history)
+    async with BufferedStream(source, maxsize=settings.CHAT_STREAM_QUEUE_SIZE) as stream:
+        async for batch in stream.batches(
+            window_ms=settings.CHAT_STREAM_COALESCE_MS,
+            max_bytes=settings.CHAT_STREAM_COALESCE_BYTES,
+        ):
+            yield batch
 
 @router.websocket("/ws/{session_id}")
-async def websocket_chat(websocket: WebSocket, session_id: str, db: Session = Depends(get_db)):
-    """WebSocket endpoint for real-time streaming chat"""
+async def websocket_chat(websocket: WebSocket, session_id: str):
+    """WebSocket endpoint for real-time streaming chat
+
+    Holds no DB session between messages: history comes from the cache (or a
+    short-lived session on a miss) and turns are persisted write-behind.
+    """
     await websocket.accept()
+    try:
+        ai_chat_service = get_ai_chat_service()
+    except ChatServiceUnavailable:
+        await websocket.send_json({"type": "error", "content": "🔑 Chat service is currently unavailable."})
+        await websocket.close(code=1011)
+        return
+    stats = StreamStats()
+    client_ip = websocket.client.host if websocket.client else None
 
     try:
         while True:
@@ -65,36 +141,209 @@ async def websocket_chat(websocket: WebSocket, session_id: str, db: Session = De
             data = await websocket.receive_text()
             user_message = json.loads(data)["message"]
 
-            # Get conversation history
-            history = db.query(ChatMessage).filter(
-                ChatMessage.session_id == session_id
-            ).order_by(ChatMessage.created_at).limit(10).all()
-
-            conversation_history = []
-            for msg in history:
-                conversation_history.append({"role": "user", "content": msg.user_message})
-                conversation_history.append({"role": "assistant", "content": msg.bot_response})
+            # Get recent conversation history (cached; a session only
+            # checks out a connection if it actually queries on a miss)
+            async with AsyncSessionLocal() as db:
+                conversation_history = await conversation_store.get_history(db, session_id)
 
-            # Stream AI response word by word
-            full_response = ""
-            for chunk in ai_chat_service.get_streaming_response(user_message, conversation_history):
-                full_response += chunk
+            # Stream AI response in coalesced batches
+            chunks = []
+            try:
+                admission.check_rate(session_id, client_ip)
+                with llm_metrics.capture() as llm_calls:
+                    async for text, count in _reply_batches(ai_chat_service, user_message, conversation_history):
+                        chunks.append(text)
+                        await websocket.send_json({
+                            "type": "stream",
+                            "content": text
+                        })
+                        stats.record(text, chunks=count)
+            except AdmissionRejected as e:
                 await websocket.send_json({
-                    "type": "stream",
-                    "content": chunk
+                    "type": "error",
+                    "content": "⏱️ I'm currently handling too many requests. Please try again in a moment!",
+                    "reason": e.reason,
+                    "retry_after": e.retry_after
                 })
+                continue
+            full_response = "".join(chunks)
 
             # Send completion signal
-            await websocket.send_json({"type": "done"})
+            turn_id = uuid.uuid4().hex
+            await websocket.send_json({"type": "done", "turn_id": turn_id})
 
-            # Save to database
-            chat_record = ChatMessage(
-                user_message=user_message,
-                bot_response=full_response,
-                session_id=session_id
-            )
-            db.add(chat_record)
-            db.commit()
+            # Save to database (batched in the background)
+            conversation_store.append(session_id, user_message, full_response)
+            await chat_writer.enqueue(user_message, full_response, session_id, llm_calls, turn_id=turn_id)
     
     except WebSocketDisconnect:
-        print(f"Client {session_id} disconnected")
\ No newline at end of file
+        print(f"Client {session_id} disconnected "
+              f"(deltas={stats.chunks}, frames={stats.frames}, bytes={stats.bytes})")
+
+async def _produce_sse_reply(ai_chat_service: AIChatService, stream: SSEStream, user_message: str):
+    """Fill an SSE stream's replay buffer; runs independently of the HTTP response
+    so a client that reconnects can resume where it left off."""
+    chunks = []
+    try:
+        async with AsyncSessionLocal() as db:
+            conversation_history = await conversation_store.get_history(db, stream.session_id)
+        with llm_metrics.capture() as llm_calls:
+            async for text, _ in _reply_batches(ai_chat_service, user_message, conversation_history):
+                chunks.append(text)
+                await stream.buffer.append(text)
+    except Exception as e:
+        await stream.buffer.finish(e)
+        return
+
+    await stream.buffer.finish()
+    sse_streams.touch(stream)
+
+    # Save to database (batched in the background)
+    full_response = "".join(chunks)
+    conversation_store.append(stream.session_id, user_message, full_response)
+    await chat_writer.enqueue(user_message, full_response, stream.session_id, llm_calls, turn_id=stream.stream_id)
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    last_event_id: Optional[str] = Header(default=None),
+    ai_chat_service: AIChatService = Depends(get_chat_service),
+):
+    """Server-Sent Events chat endpoint (one-shot streaming without a WebSocket)
+
+    Events: `start` (session/stream ids), `stream` (content chunks), `done`.
+    Idle periods carry `: ping` heartbeats. Re-sending the request with a
+    Last-Event-ID header resumes a reply from the server-side buffer.
+    """
+    stream, position = sse_streams.resume(last_event_id)
+
+    if stream is None:
+        session_id = request.session_id or str(uuid.uuid4())
+        client_ip = http_request.client.host if http_request.client else None
+        try:
+            admission.check_rate(session_id, client_ip)
+        except AdmissionRejected as e:
+            raise _too_many_requests(e)
+        stream = sse_streams.create(session_id)
+        stream.task = asyncio.create_task(_produce_sse_reply(ai_chat_service, stream, request.message))
+
+    return StreamingResponse(
+        sse_streams.events(stream, position),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+        },
+    )
+
+@router.post("/feedback")
+async def chat_feedback(feedback: FeedbackRequest, db: AsyncSession = Depends(get_write_db)):
+    """Vote on an answer (👍 / 👎) by the turn_id returned with it"""
+    # Turns are stored write-behind; a quick vote may beat its row to the database.
+    # Wait before the first query so the session holds no pooled connection meanwhile.
+    await chat_writer.wait_written(feedback.turn_id, settings.CHAT_WRITE_INTERVAL + 5)
+    message = await db.scalar(select(ChatMessage).where(ChatMessage.turn_id == feedback.turn_id))
+    if not message:
+        raise HTTPException(status_code=404, detail="Unknown chat turn")
+
+    previous = message.is_useful
+    message.is_useful = feedback.useful
+    await db.run_sync(chat_analytics.record_vote, message, previous)
+    await db.commit()
+    return {"message": "Thanks for the feedback!", "message_id": message.id}
+
+# Admin routes
+@router.get("/admin/stats")
+def admin_chat_stats(token: str):
+    """Prompt-size stats per request, for tuning the context budget"""
+    verify_admin(token)
+    stats = {
+        "history_cache": conversation_store.stats(),
+        "admission": admission.stats(),
+        "write_behind": chat_writer.stats(),
+        "retention": chat_retention.last_run,
+        "llm_recent": llm_metrics.snapshot(),
+    }
+    ai_chat_service = peek_ai_chat_service()
+    if ai_chat_service is None:
+        stats["chat_service"] = "not initialized"
+        return stats
+    stats.update({
+        "chat_service": {"provider": ai_chat_service.provider.name, "model": ai_chat_service.model},
+        "context_budget": ai_chat_service.context.budget,
+        "context": ai_chat_service.context_metrics.snapshot(),
+        "response_cache": ai_chat_service.cache.stats(),
+        "single_flight": ai_chat_service.flights.stats(),
+        "circuit_breaker": {**ai_chat_service.breaker.stats(), "degraded_answers": ai_chat_service.degraded},
+    })
+    return stats
+
+@router.delete("/admin/cache")
+def admin_purge_response_cache(token: str):
+    """Drop every cached EmpireBot answer"""
+    verify_admin(token)
+    ai_chat_service = peek_ai_chat_service()
+    purged = ai_chat_service.cache.purge() if ai_chat_service else 0
+    return {"message": f"Purged {purged} cached response(s)"}
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+def _parse_window(window: str) -> timedelta:
+    window = window.strip()
+    if len(window) < 2 or window[-1] not in WINDOW_UNITS or not window[:-1].isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid window {window!r} (use e.g. 15m, 1h, 7d)")
+    return timedelta(seconds=int(window[:-1]) * WINDOW_UNITS[window[-1]])
+
+@router.get("/admin/llm-usage")
+async def admin_llm_usage(token: str, windows: str = "15m,1h,24h", db: AsyncSession = Depends(get_read_db)):
+    """Token usage, latency percentiles and tokens/sec per model over time windows"""
+    verify_admin(token)
+    spans = {window.strip(): _parse_window(window) for window in windows.split(",")}
+    now = datetime.now(timezone.utc)
+    # Only the columns being aggregated, one scan of the widest window
+    rows = (await db.execute(
+        select(
+            LLMUsage.model, LLMUsage.ok, LLMUsage.prompt_tokens, LLMUsage.completion_tokens,
+            LLMUsage.ttft_ms, LLMUsage.latency_ms, LLMUsage.created_at,
+        ).where(LLMUsage.created_at >= now - max(spans.values()))
+    )).all()
+
+    def age(row):
+        created_at = row.created_at
+        if created_at.tzinfo is None:  # SQLite drops the offset
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return now - created_at
+
+    ages = [(age(row), row) for row in rows]
+    return {
+        "windows": {
+            window: summarize(row for row_age, row in ages if row_age <= span)
+            for window, span in spans.items()
+        }
+    }
+
+@router.get("/admin/analytics")
+async def admin_chat_analytics(token: str, granularity: str = "hour", limit: int = 24, db: AsyncSession = Depends(get_read_db)):
+    """Sessions, messages, votes and average answer length per hour/day (from rollups)"""
+    verify_admin(token)
+    if granularity not in chat_analytics.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    limit = max(1, min(limit, 24 * 31))
+    return {
+        "granularity": granularity,
+        "buckets": await db.run_sync(chat_analytics.recent_buckets, granularity, limit),
+    }
+
+@router.post("/admin/analytics/rebuild")
+async def admin_rebuild_chat_analytics(token: str):
+    """Recompute the rollups from stored chat messages"""
+    verify_admin(token)
+    buckets = await asyncio.to_thread(chat_analytics.rebuild)
+    return {"message": f"Rebuilt {buckets} rollup bucket(s)"}
+
+@router.post("/admin/retention/run")
+async def admin_run_retention(token: str):
+    """Archive and prune expired chat sessions now"""
+    verify_admin(token)
+    return await asyncio.to_thread(chat_retention.run_once)
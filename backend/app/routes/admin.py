@@ -1,12 +1,14 @@
 import os
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from pydantic import BaseModel
 
-from ..database import get_db
+from ..database import get_admin_db
 from ..models.project import Project
+from ..services.retrieval import retrieval_index
 
 # Load environment variables
 load_dotenv()
@@ -47,9 +49,9 @@ class ProjectUpdate(BaseModel):
 
 # Get all projects (admin view)
 @router.get("/projects")
-def admin_get_projects(token: str, db: Session = Depends(get_db)):
+async def admin_get_projects(token: str, db: AsyncSession = Depends(get_admin_db)):
     verify_admin(token)
-    projects = db.query(Project).all()
+    projects = (await db.scalars(select(Project))).all()
     
     # Convert to dict format
     projects_data = [
@@ -74,10 +76,10 @@ def admin_get_projects(token: str, db: Session = Depends(get_db)):
 
 # Create project
 @router.post("/projects")
-def admin_create_project(
+async def admin_create_project(
     project: ProjectCreate,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_admin_db)
 ):
     verify_admin(token)
     
@@ -93,8 +95,9 @@ def admin_create_project(
     )
     
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
+    await db.commit()
+    await db.refresh(db_project)
+    retrieval_index.index_project(db_project)
     
     return {
         "message": "Project created successfully",
@@ -108,15 +111,15 @@ def admin_create_project(
 
 # Update project
 @router.put("/projects/{project_id}")
-def admin_update_project(
+async def admin_update_project(
     project_id: int,
     project: ProjectUpdate,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_admin_db)
 ):
     verify_admin(token)
     
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -125,8 +128,9 @@ def admin_update_project(
     for key, value in update_data.items():
         setattr(db_project, key, value)
     
-    db.commit()
-    db.refresh(db_project)
+    await db.commit()
+    await db.refresh(db_project)
+    retrieval_index.index_project(db_project)
     
     return {
         "message": "Project updated successfully",
@@ -139,18 +143,19 @@ def admin_update_project(
 
 # Delete project
 @router.delete("/projects/{project_id}")
-def admin_delete_project(
+async def admin_delete_project(
     project_id: int,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_admin_db)
 ):
     verify_admin(token)
     
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(db_project)
-    db.commit()
+    await db.delete(db_project)
+    await db.commit()
+    retrieval_index.remove_project(project_id)
     
     return {"message": "Project deleted successfully"}
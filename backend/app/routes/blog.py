@@ -1,13 +1,22 @@
+import asyncio
+import base64
+import json
 import os
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import String, select, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, load_only
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from ..database import get_db
+from ..database import get_admin_db, get_read_db
 from ..models.blog import BlogPost
+from ..services import blog_render, blog_search
+from ..services.retrieval import retrieval_index
+from ..services.view_counter import view_counter
+from ..utils.fields import FieldSet
 
 # Load environment variables
 load_dotenv()
@@ -44,71 +53,150 @@ def verify_admin(token: str):
     if token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+# Fields of the public post list - the query loads only the requested ones
+# (content is never loaded for lists)
+POST_LIST_FIELDS = FieldSet({
+    "id": ((BlogPost.id,), lambda p: p.id),
+    "title": ((BlogPost.title,), lambda p: p.title),
+    "slug": ((BlogPost.slug,), lambda p: p.slug),
+    "excerpt": ((BlogPost.excerpt,), lambda p: p.excerpt),
+    "category": ((BlogPost.category,), lambda p: p.category),
+    "tags": ((BlogPost.tags,), lambda p: p.tags.split(",") if p.tags else []),
+    "image_url": ((BlogPost.image_url,), lambda p: p.image_url),
+    "author": ((BlogPost.author,), lambda p: p.author),
+    "featured": ((BlogPost.featured,), lambda p: p.featured),
+    "views": ((BlogPost.views,), lambda p: view_counter.views(p.id, p.views)),
+    "read_time": ((BlogPost.read_time,), lambda p: p.read_time),
+    "created_at": ((BlogPost.created_at,), lambda p: p.created_at.isoformat()),
+})
+
+ADMIN_LIST_COLUMNS = (
+    BlogPost.title, BlogPost.slug, BlogPost.excerpt, BlogPost.category,
+    BlogPost.published, BlogPost.featured, BlogPost.views, BlogPost.created_at,
+)
+
+def _created_at_key(dialect: str):
+    # SQLite stores CURRENT_TIMESTAMP text ("YYYY-MM-DD HH:MM:SS") that a bound
+    # datetime ("... .000000") never equals, so cursors carry the stored text there
+    return type_coerce(BlogPost.created_at, String) if dialect == "sqlite" else BlogPost.created_at
+
+def _encode_cursor(created_at, post_id: int) -> str:
+    key = created_at if isinstance(created_at, str) else created_at.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([key, post_id]).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, dialect: str):
+    try:
+        key, post_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (key if dialect == "sqlite" else datetime.fromisoformat(key)), int(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # Public routes
 @router.get("/posts")
-def get_published_posts(
+async def get_published_posts(
     skip: int = 0,
     limit: int = 10,
     category: str | None = None,
-    db: Session = Depends(get_db)
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(BlogPost).filter(BlogPost.published == True)
+    """Newest published posts. Pass the returned next_cursor to get the following
+    page at constant cost; skip still works but deep offsets scan every skipped row.
+    fields=id,title,slug limits the response (and the query) to those fields."""
+    limit = max(1, min(limit, 100))
+    names = POST_LIST_FIELDS.parse(fields)
+    dialect = db.bind.dialect.name
+    created_at = _created_at_key(dialect)
+    query = select(BlogPost, created_at.label("sort_key")) \
+        .options(POST_LIST_FIELDS.load(names)) \
+        .where(BlogPost.published == True)
     
     if category:
-        query = query.filter(BlogPost.category == category)
+        query = query.where(BlogPost.category == category)
+    
+    if cursor:
+        # Seek past the last row of the previous page (an index range scan)
+        query = query.where(tuple_(created_at, BlogPost.id) < tuple_(*_decode_cursor(cursor, dialect)))
+    else:
+        query = query.offset(skip)
     
-    posts = query.order_by(BlogPost.created_at.desc()).offset(skip).limit(limit).all()
+    rows = (await db.execute(query.order_by(created_at.desc(), BlogPost.id.desc()).limit(limit + 1))).all()
+    next_cursor = _encode_cursor(rows[limit - 1].sort_key, rows[limit - 1].BlogPost.id) if len(rows) > limit else None
+    posts = [row.BlogPost for row in rows[:limit]]
     
     return {
-        "posts": [
-            {
-                "id": p.id,
-                "title": p.title,
-                "slug": p.slug,
-                "excerpt": p.excerpt,
-                "category": p.category,
-                "tags": p.tags.split(",") if p.tags else [],
-                "image_url": p.image_url,
-                "author": p.author,
-                "featured": p.featured,
-                "views": p.views,
-                "created_at": p.created_at.isoformat(),
-            }
-            for p in posts
-        ]
+        "posts": [POST_LIST_FIELDS.render(p, names) for p in posts],
+        "next_cursor": next_cursor,
     }
 
+@router.get("/search")
+async def search_posts(
+    q: str,
+    skip: int = 0,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Ranked full-text search over published posts; snippets mark matches with <mark>"""
+    limit = max(1, min(limit, 50))
+    found = await db.run_sync(blog_search.search, q, limit, max(0, skip))
+    for result in found["results"]:
+        result["views"] = view_counter.views(result["id"], result["views"])
+    return {"query": q, "skip": skip, "limit": limit, **found}
+
 @router.get("/posts/{slug}")
-def get_post_by_slug(slug: str, db: Session = Depends(get_db)):
-    post = db.query(BlogPost).filter(BlogPost.slug == slug).first()
+async def get_post_by_slug(slug: str, format: str = "source", db: AsyncSession = Depends(get_read_db)):
+    """A post by slug. format=html returns the pre-rendered content_html instead of the source."""
+    if format not in ("source", "html"):
+        raise HTTPException(status_code=400, detail="format must be 'source' or 'html'")
+    # Only one of the two large text columns is needed
+    unused = BlogPost.content if format == "html" else BlogPost.content_html
+    post = await db.scalar(select(BlogPost).options(defer(unused)).where(BlogPost.slug == slug))
     
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    # Increment views
-    post.views += 1
-    db.commit()
+    # Buffered; written in batches by the view counter
+    view_counter.incr(post.id)
+    
+    if format == "html":
+        content = {"content_html": post.content_html}
+        if post.content_html is None:
+            # Not rendered yet (written outside the admin API) - render for this response only
+            await db.refresh(post, ["content"])
+            content["content_html"] = (await asyncio.to_thread(blog_render.render, post.content)).html
+    else:
+        content = {"content": post.content}
     
     return {
         "id": post.id,
         "title": post.title,
         "slug": post.slug,
-        "content": post.content,
+        **content,
+        "toc": post.toc or [],
+        "read_time": post.read_time,
         "excerpt": post.excerpt,
         "category": post.category,
         "tags": post.tags.split(",") if post.tags else [],
         "image_url": post.image_url,
         "author": post.author,
-        "views": post.views,
+        "views": view_counter.views(post.id, post.views),
         "created_at": post.created_at.isoformat(),
         "updated_at": post.updated_at.isoformat() if post.updated_at else None,
     }
 
 # Admin routes
+async def _render_content(post: BlogPost):
+    """Pre-render the post's HTML, TOC and read time - once per content change"""
+    if blog_render.is_stale(post):
+        blog_render.apply(post, await asyncio.to_thread(blog_render.render, post.content))
+
 @router.get("/admin/posts")
-def admin_get_all_posts(token: str, db: Session = Depends(get_db)):
+async def admin_get_all_posts(token: str, db: AsyncSession = Depends(get_admin_db)):
     verify_admin(token)
-    posts = db.query(BlogPost).order_by(BlogPost.created_at.desc()).all()
+    posts = (await db.scalars(
+        select(BlogPost).options(load_only(*ADMIN_LIST_COLUMNS)).order_by(BlogPost.created_at.desc())
+    )).all()
     
     return {
         "posts": [
@@ -120,7 +208,7 @@ def admin_get_all_posts(token: str, db: Session = Depends(get_db)):
                 "category": p.category,
                 "published": p.published,
                 "featured": p.featured,
-                "views": p.views,
+                "views": view_counter.views(p.id, p.views),
                 "created_at": p.created_at.isoformat(),
             }
             for p in posts
@@ -128,30 +216,35 @@ def admin_get_all_posts(token: str, db: Session = Depends(get_db)):
     }
 
 @router.post("/admin/posts")
-def admin_create_post(
+async def admin_create_post(
     post: BlogPostCreate,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_admin_db)
 ):
     verify_admin(token)
     
     db_post = BlogPost(**post.dict())
+    await _render_content(db_post)
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    await db.flush()
+    # Search index changes commit together with the post
+    await db.run_sync(blog_search.index_post, db_post)
+    await db.commit()
+    await db.refresh(db_post)
+    retrieval_index.index_post(db_post)
     
     return {"message": "Post created", "post_id": db_post.id}
 
 @router.put("/admin/posts/{post_id}")
-def admin_update_post(
+async def admin_update_post(
     post_id: int,
     post: BlogPostUpdate,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_admin_db)
 ):
     verify_admin(token)
     
-    db_post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
+    db_post = await db.get(BlogPost, post_id)
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
     
@@ -159,18 +252,26 @@ def admin_update_post(
     for key, value in update_data.items():
         setattr(db_post, key, value)
     
-    db.commit()
+    await _render_content(db_post)
+    await db.flush()
+    await db.run_sync(blog_search.index_post, db_post)
+    await db.commit()
+    await db.refresh(db_post)
+    retrieval_index.index_post(db_post)
     return {"message": "Post updated"}
 
 @router.delete("/admin/posts/{post_id}")
-def admin_delete_post(post_id: int, token: str, db: Session = Depends(get_db)):
+async def admin_delete_post(post_id: int, token: str, db: AsyncSession = Depends(get_admin_db)):
     verify_admin(token)
     
-    db_post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
+    db_post = await db.get(BlogPost, post_id)
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    db.delete(db_post)
-    db.commit()
+    await db.delete(db_post)
+    await db.run_sync(blog_search.remove_post, post_id)
+    await db.commit()
+    retrieval_index.remove_post(post_id)
+    view_counter.discard(post_id)
     
     return {"message": "Post deleted"}
@@ -1,44 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_read_db
 from ..models.project import Project
+from ..utils.fields import FieldSet
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
+# Fields of the public project list (title/tags/demo_url are compatibility aliases)
+PROJECT_LIST_FIELDS = FieldSet({
+    "id": ((Project.id,), lambda p: p.id),
+    "title": ((Project.name,), lambda p: p.name),
+    "name": ((Project.name,), lambda p: p.name),
+    "category": ((Project.category,), lambda p: p.category),
+    "status": ((Project.status,), lambda p: p.status),
+    "description": ((Project.description,), lambda p: p.description),
+    "tech": ((Project.tech,), lambda p: p.tech),
+    "tags": ((Project.tech,), lambda p: p.tech),
+    "image_url": ((Project.image_url,), lambda p: p.image_url),
+    "github_url": ((Project.github_url,), lambda p: p.github_url),
+    "live_url": ((Project.live_url,), lambda p: p.live_url),
+    "demo_url": ((Project.live_url,), lambda p: p.live_url),
+})
+
 
 # GET all projects (public - no auth required)
 @router.get("")
-async def get_all_projects(db: Session = Depends(get_db)):
-    """Fetch all published projects from database"""
-    projects = db.query(Project).all()
-    
-    # Convert SQLAlchemy models to dict
-    projects_data = [
-        {
-            "id": p.id,
-            "title": p.name,  # Using 'name' from your existing model
-            "name": p.name,
-            "category": p.category,
-            "status": p.status,
-            "description": p.description,
-            "tech": p.tech,
-            "tags": p.tech,  # Map tech to tags for compatibility
-            "image_url": p.image_url,
-            "github_url": p.github_url,
-            "live_url": p.live_url,
-            "demo_url": p.live_url,  # Map live_url to demo_url for compatibility
-        }
-        for p in projects
-    ]
+async def get_all_projects(fields: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    """Fetch all published projects from database (fields=id,name,... for a subset)"""
+    names = PROJECT_LIST_FIELDS.parse(fields)
+    projects = (await db.scalars(select(Project).options(PROJECT_LIST_FIELDS.load(names)))).all()
     
-    return {"projects": projects_data}
+    return {"projects": [PROJECT_LIST_FIELDS.render(p, names) for p in projects]}
 
 
 # GET single project by ID (public - for detail page)
 @router.get("/{project_id}")
-async def get_project_by_id(project_id: int, db: Session = Depends(get_db)):
+async def get_project_by_id(project_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a single project by ID (public endpoint)"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
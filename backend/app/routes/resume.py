@@ -1,4 +1,5 @@
 import os
+import asyncio
 import json
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -7,11 +8,13 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_admin_db, get_read_db
 from ..models.resume import ResumeData  # existing SQLAlchemy model
 from ..services.pdf_generator import generate_resume_pdf
+from ..services.retrieval import retrieval_index
 
 # Load environment variables
 load_dotenv()
@@ -239,8 +242,8 @@ DEFAULT_RESUME_DATA = {
 
 # Get resume data (PUBLIC - No auth required)
 @router.get("/data")
-def get_resume_data(db: Session = Depends(get_db)):
-    resume = db.query(ResumeData).first()
+async def get_resume_data(db: AsyncSession = Depends(get_read_db)):
+    resume = await db.scalar(select(ResumeData).limit(1))
 
     if not resume:
         return {
@@ -269,8 +272,8 @@ def get_resume_data(db: Session = Depends(get_db)):
 
 # Download PDF (PUBLIC - No auth required)
 @router.get("/download")
-def download_resume_pdf(db: Session = Depends(get_db)):
-    resume = db.query(ResumeData).first()
+async def download_resume_pdf(db: AsyncSession = Depends(get_read_db)):
+    resume = await db.scalar(select(ResumeData).limit(1))
 
     if not resume:
         resume_dict = DEFAULT_RESUME_DATA
@@ -292,7 +295,8 @@ def download_resume_pdf(db: Session = Depends(get_db)):
             "certifications": resume.certifications or [],
         }
 
-    pdf_buffer = generate_resume_pdf(resume_dict)
+    # PDF rendering is CPU-bound; keep it off the event loop
+    pdf_buffer = await asyncio.to_thread(generate_resume_pdf, resume_dict)
 
     filename = resume_dict["full_name"].replace(" ", "_")
 
@@ -309,14 +313,14 @@ def download_resume_pdf(db: Session = Depends(get_db)):
 
 # Update resume data (ADMIN ONLY - POST)
 @router.post("/data")
-def update_resume_data(
+async def update_resume_data(
     data: ResumeDataCreate,
     token: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_admin_db),
 ):
     verify_admin(token)
 
-    resume = db.query(ResumeData).first()
+    resume = await db.scalar(select(ResumeData).limit(1))
 
     if resume:
         for key, value in data.dict().items():
@@ -325,8 +329,9 @@ def update_resume_data(
         resume = ResumeData(**data.dict())
         db.add(resume)
 
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
+    await db.refresh(resume)
+    retrieval_index.index_resume(resume)
 
     return {"message": "Resume data updated", "id": resume.id}
 
@@ -339,7 +344,7 @@ def update_resume_data(
 async def upload_resume_json(
     file: UploadFile = File(...),
     token: str = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_admin_db),
 ):
     """
     Upload resume JSON file.
@@ -378,7 +383,7 @@ async def upload_resume_json(
             raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
 
     # Upsert into ResumeData
-    resume = db.query(ResumeData).first()
+    resume = await db.scalar(select(ResumeData).limit(1))
 
     if resume:
         for key, value in resume_data.items():
@@ -406,8 +411,9 @@ async def upload_resume_json(
         resume = ResumeData(**init_kwargs)
         db.add(resume)
 
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
+    await db.refresh(resume)
+    retrieval_index.index_resume(resume)
 
     return {"message": "Resume uploaded successfully", "id": resume.id}
 
@@ -418,10 +424,10 @@ async def upload_resume_json(
 
 # Export resume data as JSON (ADMIN ONLY)
 @router.get("/export")
-def export_resume_json(token: str = Query(...), db: Session = Depends(get_db)):
+async def export_resume_json(token: str = Query(...), db: AsyncSession = Depends(get_admin_db)):
     verify_admin(token)
 
-    resume = db.query(ResumeData).first()
+    resume = await db.scalar(select(ResumeData).limit(1))
 
     if not resume:
         return DEFAULT_RESUME_DATA
@@ -448,28 +454,29 @@ def export_resume_json(token: str = Query(...), db: Session = Depends(get_db)):
 
 # Initialize default resume data - POST (PowerShell)
 @router.post("/init")
-def initialize_resume_data(token: str = Query(...), db: Session = Depends(get_db)):
+async def initialize_resume_data(token: str = Query(...), db: AsyncSession = Depends(get_admin_db)):
     verify_admin(token)
 
-    existing = db.query(ResumeData).first()
+    existing = await db.scalar(select(ResumeData).limit(1))
     if existing:
         return {"message": "Resume data already exists", "id": existing.id}
 
     resume = ResumeData(**DEFAULT_RESUME_DATA)
     db.add(resume)
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
+    await db.refresh(resume)
+    retrieval_index.index_resume(resume)
 
     return {"message": "Default resume data initialized", "id": resume.id}
 
 
 # Initialize default resume data - GET (Browser)
 @router.get("/init")
-def initialize_resume_data_browser(token: str = Query(...), db: Session = Depends(get_db)):
+async def initialize_resume_data_browser(token: str = Query(...), db: AsyncSession = Depends(get_admin_db)):
     """Browser-accessible version of /init endpoint"""
     verify_admin(token)
 
-    existing = db.query(ResumeData).first()
+    existing = await db.scalar(select(ResumeData).limit(1))
     if existing:
         return {
             "message": "Resume data already exists",
@@ -479,8 +486,9 @@ def initialize_resume_data_browser(token: str = Query(...), db: Session = Depend
 
     resume = ResumeData(**DEFAULT_RESUME_DATA)
     db.add(resume)
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
+    await db.refresh(resume)
+    retrieval_index.index_resume(resume)
 
     return {
         "message": "Default resume data initialized successfully!",
@@ -491,24 +499,28 @@ def initialize_resume_data_browser(token: str = Query(...), db: Session = Depend
 
 # Delete resume data - DELETE (PowerShell)
 @router.delete("/delete")
-def delete_resume_data(token: str = Query(...), db: Session = Depends(get_db)):
+async def delete_resume_data(token: str = Query(...), db: AsyncSession = Depends(get_admin_db)):
     """Delete all resume data (admin only)"""
     verify_admin(token)
 
-    deleted_count = db.query(ResumeData).delete()
-    db.commit()
+    deleted_count = (await db.execute(delete(ResumeData))).rowcount
+    await db.commit()
+    # Public endpoints fall back to the default data, so the chatbot does too
+    retrieval_index.index_resume(DEFAULT_RESUME_DATA)
 
     return {"message": f"Deleted {deleted_count} resume record(s)"}
 
 
 # Delete resume data - GET (Browser)
 @router.get("/delete")
-def delete_resume_data_browser(token: str = Query(...), db: Session = Depends(get_db)):
+async def delete_resume_data_browser(token: str = Query(...), db: AsyncSession = Depends(get_admin_db)):
     """Browser-accessible version of /delete endpoint"""
     verify_admin(token)
 
-    deleted_count = db.query(ResumeData).delete()
-    db.commit()
+    deleted_count = (await db.execute(delete(ResumeData))).rowcount
+    await db.commit()
+    # Public endpoints fall back to the default data, so the chatbot does too
+    retrieval_index.index_resume(DEFAULT_RESUME_DATA)
 
     return {
         "message": f"Successfully deleted {deleted_count} resume record(s)",  # ✅ FIXED
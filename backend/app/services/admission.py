@@ -0,0 +1,151 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from ..config import settings
+from ..utils.ttl_cache import TTLCache
+
+
+class AdmissionRejected(Exception):
+    """Request shed by the rate limits or the upstream queue; `retry_after` is in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; returns 0 if granted, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Gatekeeper in front of the AI upstream.
+
+    The routes check each request against its session and client-IP token
+    buckets. The chat service then takes one of `max_concurrent` upstream
+    slots around the real provider call only, so cache hits and requests
+    sharing an in-flight call don't use one. When all slots are busy a call
+    waits in a bounded FIFO queue for at most `queue_timeout` seconds.
+    Anything over those limits is rejected with a retry hint.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 session_rate: float, session_burst: float,
+                 ip_rate: float, ip_burst: float, max_buckets: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.session_limit = (session_rate, session_burst)
+        self.ip_limit = (ip_rate, ip_burst)
+        # An idle bucket refills completely within this time, so forgetting it is safe
+        bucket_ttl = max(session_burst / session_rate, ip_burst / ip_rate)
+        self._buckets = TTLCache(maxsize=max_buckets, ttl=bucket_ttl)
+        self._active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected: Counter = Counter()
+
+    def check_rate(self, session_id: str, client_ip: Optional[str]):
+        """Per-session and per-IP rate limits (at the edge, before any work)"""
+        self._check_rate(f"session:{session_id}", self.session_limit, "session_rate")
+        if client_ip:
+            self._check_rate(f"ip:{client_ip}", self.ip_limit, "ip_rate")
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one upstream slot, queueing for it if all are busy"""
+        await self._acquire()
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _check_rate(self, key: str, limit: tuple, reason: str):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*limit)
+        wait = bucket.take()
+        self._buckets.set(key, bucket)
+        if wait > 0:
+            self.rejected[reason] += 1
+            raise AdmissionRejected(reason, wait)
+
+    async def _acquire(self):
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A released slot is handed over directly by resolving the future
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.rejected["queue_timeout"] += 1
+            raise AdmissionRejected("queue_timeout", self.queue_timeout)
+        except asyncio.CancelledError:
+            # Caller went away; give back a slot we may already have been handed
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot passes to the waiter as-is
+                return
+        self._active -= 1
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+admission = AdmissionController(
+    max_concurrent=settings.CHAT_MAX_CONCURRENT,
+    max_queue=settings.CHAT_MAX_QUEUE,
+    queue_timeout=settings.CHAT_QUEUE_TIMEOUT,
+    session_rate=settings.CHAT_SESSION_RATE,
+    session_burst=settings.CHAT_SESSION_BURST,
+    ip_rate=settings.CHAT_IP_RATE,
+    ip_burst=settings.CHAT_IP_BURST,
+    max_buckets=settings.CHAT_RATE_BUCKETS,
+)
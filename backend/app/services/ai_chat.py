@@ -1,24 +1,20 @@
-from groq import Groq
-from typing import List, Dict
+import asyncio
+import hashlib
+import json
+import re
+from contextlib import aclosing
+from typing import AsyncIterator, List, Dict, Optional
 from ..config import settings
+from ..utils.ttl_cache import TTLCache
+from .admission import admission
+from .circuit_breaker import CircuitBreaker
+from .context_window import ContextAssembler, ContextMetrics
+from .llm_metrics import LLMCall, llm_metrics
+from .llm_providers import LLMProvider, Usage, create_provider
+from .retrieval import retrieval_index
+from .single_flight import SingleFlight
 
-class AIChatService:
-    def __init__(self):
-        """Initialize Groq client"""
-        if not settings.GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY not found in settings!")
-        
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        self.model = "llama-3.3-70b-versatile"
-        print(f"✅ AIChatService initialized with model: {self.model}")
-        
-    def get_response(self, user_message: str, conversation_history: List[Dict] = None) -> str:
-        """Get AI response for a user message"""
-        
-        messages = [
-            {
-                "role": "system",
-                "content": """You are EmpireBot, an AI assistant for Digital Empire portfolio.
+SYSTEM_PROMPT = """You are EmpireBot, an AI assistant for Digital Empire portfolio.
 
 **About You:**
 - Name: EmpireBot (Digital Empire Assistant)
@@ -26,80 +22,352 @@ class AIChatService:
 - Personality: Friendly, technical, and enthusiastic about technology
 - Creator: Digital Empire development team
 
-**Digital Empire Projects:**
-1. AI/ML: Chatbots, Computer Vision, NLP, Predictive models
-2. Web Dev: React, FastAPI, Full-stack applications
-3. Blockchain: Smart contracts, DeFi, NFT marketplaces, Trading bots
-4. Gaming: 3D games (Three.js), Browser games, Mobile games
-5. Creative: Manga reader, Wallpaper websites
-
 When asked about yourself, introduce your role and the Digital Empire ecosystem.
 Be concise, friendly, and helpful. Keep responses under 200 words unless asked for details."""
-            }
-        ]
-        
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
+
+STREAMING_SYSTEM_PROMPT = "You are EmpireBot, a helpful AI assistant for Digital Empire portfolio. Be concise and friendly."
+
+# Appended when the retrieval index has content matching the question
+GROUNDING_PROMPT = """
+
+**Relevant portfolio content:**
+{snippets}
+
+Answer questions about projects, posts and experience from the content above.
+If it doesn't cover the question, say you're not sure instead of guessing."""
+
+# Served while the upstream circuit is open and no fallback model answered
+BUSY_MESSAGE = "⏱️ EmpireBot is running in reduced mode while the AI service recovers. Please try again in a minute!"
+
+
+def _prompt_version(system_prompt: str) -> str:
+    # Editing a prompt changes its version, so stale cached answers stop matching
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_message(message: str) -> str:
+    text = re.sub(r"\s+", " ", message.strip().lower())
+    return text.rstrip("?!. ")
+
+
+def request_key(model: str, system_prompt: str, user_message: str, conversation_history: List[Dict] = None) -> str:
+    """Identity of an upstream request: same key, same answer"""
+    payload = json.dumps(
+        [model, _prompt_version(system_prompt), normalize_message(user_message), conversation_history or []],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of finished answers for history-free (or short-history) prompts.
+
+    Keys combine the model, system-prompt version, normalized user message and
+    any (short) history, so "Who are you?" and "who are you" share an entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_history_turns: int):
+        self.max_history_turns = max_history_turns
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model: str, system_prompt: str, user_message: str, conversation_history: List[Dict] = None) -> Optional[str]:
+        """Cache key for a request, or None when it isn't cacheable"""
+        history = conversation_history or []
+        user_turns = sum(1 for msg in history if msg["role"] == "user")
+        if user_turns > self.max_history_turns:
+            return None
+        return request_key(model, system_prompt, user_message, history)
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Optional[str], value: str):
+        if key is not None and value:
+            self._entries.set(key, value)
+
+    def purge(self) -> int:
+        return self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+        }
+
+
+def replay_stream_chunks(text: str, words_per_chunk: int = 8) -> List[str]:
+    """Split a cached answer into word-group chunks for a synthetic stream"""
+    words = re.findall(r"\S+\s*", text)
+    return ["".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+
+class AIChatService:
+    def __init__(self, provider: LLMProvider = None):
+        """Initialize the chat service on top of an LLM provider (CHAT_PROVIDER)"""
+        self.provider = provider or create_provider(settings.CHAT_PROVIDER)
+        self.model = self.provider.model
+        self.context = ContextAssembler(
+            budget=settings.CHAT_CONTEXT_BUDGET,
+            compact_tokens=settings.CHAT_CONTEXT_COMPACT_TOKENS,
+            recent_turns=settings.CHAT_CONTEXT_RECENT_TURNS,
+        )
+        self.context_metrics = ContextMetrics()
+        self.cache = ResponseCache(
+            maxsize=settings.CHAT_CACHE_SIZE,
+            ttl=settings.CHAT_CACHE_TTL,
+            max_history_turns=settings.CHAT_CACHE_MAX_HISTORY_TURNS,
+        )
+        # Concurrent identical requests share one upstream call
+        self.flights = SingleFlight()
+        # Stop waiting on a degraded upstream; answer from the fallback model instead
+        self.breaker = CircuitBreaker(
+            window=settings.CHAT_BREAKER_WINDOW,
+            min_calls=settings.CHAT_BREAKER_MIN_CALLS,
+            error_rate=settings.CHAT_BREAKER_ERROR_RATE,
+            latency_ms=settings.CHAT_BREAKER_LATENCY_MS,
+            open_seconds=settings.CHAT_BREAKER_OPEN_SECONDS,
+        )
+        fallback_model = settings.CHAT_FALLBACK_MODEL
+        self.fallback = self.provider.with_model(fallback_model) if fallback_model and fallback_model != self.model else None
+        self.degraded = 0
+        print(f"✅ AIChatService initialized with provider: {self.provider.name}, model: {self.model}")
+
+    async def aclose(self):
+        """Close pooled upstream connections"""
+        await self.provider.aclose()
+
+    def _grounded_prompt(self, system_prompt: str, user_message: str) -> str:
+        # Only the top-k matching snippets go in, not the whole portfolio
+        snippets = retrieval_index.context_for(user_message)
+        if not snippets:
+            return system_prompt
+        return system_prompt + GROUNDING_PROMPT.format(snippets=snippets)
+
+    def _build_messages(self, system_prompt: str, user_message: str, conversation_history: List[Dict] = None) -> List[Dict]:
+        # Trim/compact history so the prompt stays within the token budget
+        messages, stats = self.context.build(system_prompt, user_message, conversation_history)
+        self.context_metrics.record(stats)
+        return messages
+
+    def _error_message(self, error: Exception) -> str:
+        error_msg = str(error)
+        print(f"❌ {self.provider.name} API error: {error_msg or type(error).__name__}")
+
+        # Provide helpful error messages
+        if isinstance(error, asyncio.TimeoutError):
+            return "⏱️ The AI service is responding slowly right now. Please try again in a moment!"
+        if "rate_limit" in error_msg.lower():
+            return "⏱️ I'm currently handling too many requests. Please try again in a moment!"
+        elif "api_key" in error_msg.lower():
+            return "🔑 API configuration issue. Please contact the administrator."
+        else:
+            return f"⚠️ I encountered a technical issue: {error_msg[:100]}. Please try rephrasing your question!"
+
+    async def _upstream_complete(self, provider: LLMProvider, messages: List[Dict], call: LLMCall) -> str:
+        """One completion, bounded by CHAT_UPSTREAM_TIMEOUT and recorded in llm_metrics"""
+        usage = Usage()
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
-                model=self.model,
-                temperature=0.7,
-                max_tokens=500,
+            response = await asyncio.wait_for(
+                provider.complete(messages, temperature=0.7, max_tokens=500, usage=usage),
+                timeout=settings.CHAT_UPSTREAM_TIMEOUT,
             )
-            
-            return chat_completion.choices[0].message.content
-            
-        except Exception as e:
-            error_msg = str(e)
-            print(f"❌ Groq API error: {error_msg}")
-            
-            # Provide helpful error messages
-            if "rate_limit" in error_msg.lower():
-                return "⏱️ I'm currently handling too many requests. Please try again in a moment!"
-            elif "api_key" in error_msg.lower():
-                return "🔑 API configuration issue. Please contact the administrator."
+        except Exception:
+            llm_metrics.record(call.finish(False, usage))
+            raise
+        llm_metrics.record(call.finish(True, usage))
+        return response
+
+    async def _upstream_stream(self, provider: LLMProvider, messages: List[Dict], call: LLMCall) -> AsyncIterator[str]:
+        """One stream, first chunk bounded by CHAT_UPSTREAM_TIMEOUT, recorded in llm_metrics"""
+        usage = Usage()
+        stream = provider.stream(messages, temperature=0.7, max_tokens=500, usage=usage)
+        try:
+            chunk = await asyncio.wait_for(anext(stream, None), timeout=settings.CHAT_UPSTREAM_TIMEOUT)
+            while chunk is not None:
+                call.first_token()
+                yield chunk
+                chunk = await anext(stream, None)
+        except Exception:
+            llm_metrics.record(call.finish(False, usage))
+            raise
+        else:
+            llm_metrics.record(call.finish(True, usage))
+        finally:
+            await stream.aclose()
+
+    async def get_response(self, user_message: str, conversation_history: List[Dict] = None) -> str:
+        """Get AI response for a user message without blocking the event loop"""
+
+        system_prompt = self._grounded_prompt(SYSTEM_PROMPT, user_message)
+        cache_key = self.cache.key(self.model, system_prompt, user_message, conversation_history)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        flight_key = request_key(self.model, system_prompt, user_message, conversation_history)
+        return await self.flights.do(
+            flight_key,
+            lambda: self._complete(system_prompt, user_message, conversation_history, cache_key),
+        )
+
+    async def _complete(self, system_prompt: str, user_message: str, conversation_history: Optional[List[Dict]], cache_key: Optional[str]) -> str:
+        messages = self._build_messages(system_prompt, user_message, conversation_history)
+        # Only real upstream calls take a slot; may raise AdmissionRejected
+        async with admission.slot():
+            return await self._complete_upstream(messages, cache_key)
+
+    async def _complete_upstream(self, messages: List[Dict], cache_key: Optional[str]) -> str:
+        error = None
+        if self.breaker.allow():
+            call = LLMCall(self.model)
+            try:
+                response = await self._upstream_complete(self.provider, messages, call)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                self.breaker.record(False, call.wait_seconds)
+                error = e
             else:
-                return f"⚠️ I encountered a technical issue: {error_msg[:100]}. Please try rephrasing your question!"
-    
-    def get_streaming_response(self, user_message: str, conversation_history: List[Dict] = None):
+                self.breaker.record(True, call.wait_seconds)
+                self.cache.set(cache_key, response)
+                return response
+
+        return await self._degraded_response(messages, error)
+
+    async def _degraded_response(self, messages: List[Dict], error: Optional[Exception]) -> str:
+        """Fallback model answer, or a canned reply, when the primary model can't answer"""
+        self.degraded += 1
+        if self.fallback is not None:
+            try:
+                # Not cached: the primary model should answer once it recovers
+                return await self._upstream_complete(self.fallback, messages, LLMCall(self.fallback.model))
+            except Exception as e:
+                print(f"❌ Fallback model {self.fallback.model} failed: {e!r}")
+        return self._error_message(error) if error is not None else BUSY_MESSAGE
+
+    async def get_streaming_response(self, user_message: str, conversation_history: List[Dict] = None) -> AsyncIterator[str]:
         """Get streaming AI response"""
-        
-        messages = [
-            {
-                "role": "system",
-                "content": "You are EmpireBot, a helpful AI assistant for Digital Empire portfolio. Be concise and friendly."
-            }
-        ]
-        
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
+
+        system_prompt = self._grounded_prompt(STREAMING_SYSTEM_PROMPT, user_message)
+        cache_key = self.cache.key(self.model, system_prompt, user_message, conversation_history)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            # Replay the cached answer as a fast synthetic stream
+            for chunk in replay_stream_chunks(cached):
+                yield chunk
+                await asyncio.sleep(0)
+            return
+
+        # Identical concurrent requests subscribe to one upstream stream
+        flight_key = request_key(self.model, system_prompt, user_message, conversation_history)
+        shared = self.flights.stream(
+            flight_key,
+            lambda: self._stream_upstream(system_prompt, user_message, conversation_history, cache_key),
+        )
+        async for chunk in shared:
+            yield chunk
+
+    async def _stream_upstream(self, system_prompt: str, user_message: str, conversation_history: Optional[List[Dict]], cache_key: Optional[str]) -> AsyncIterator[str]:
+        messages = self._build_messages(system_prompt, user_message, conversation_history)
+        # Held until the stream ends; may raise AdmissionRejected before the first chunk
+        async with admission.slot():
+            async with aclosing(self._stream_with_fallback(messages, cache_key)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    async def _stream_with_fallback(self, messages: List[Dict], cache_key: Optional[str]) -> AsyncIterator[str]:
+        error = None
+        if self.breaker.allow():
+            call = LLMCall(self.model)
+            chunks = []
+            try:
+                async with aclosing(self._upstream_stream(self.provider, messages, call)) as upstream:
+                    async for chunk in upstream:
+                        chunks.append(chunk)
+                        yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                # Streams are judged on time-to-first-token
+                self.breaker.record(False, call.wait_seconds)
+                if chunks:
+                    # Already mid-answer, too late to switch models
+                    yield f"⚠️ Error: {str(e)}"
+                    return
+                error = e
+            else:
+                self.breaker.record(True, call.wait_seconds)
+                # Only complete, error-free answers are cached
+                self.cache.set(cache_key, "".join(chunks))
+                return
+
+        async for chunk in self._degraded_stream(messages, error):
+            yield chunk
+
+    async def _degraded_stream(self, messages: List[Dict], error: Optional[Exception]) -> AsyncIterator[str]:
+        """Streaming counterpart of _degraded_response"""
+        self.degraded += 1
+        if self.fallback is not None:
+            sent = False
+            try:
+                upstream = self._upstream_stream(self.fallback, messages, LLMCall(self.fallback.model))
+                async with aclosing(upstream):
+                    async for chunk in upstream:
+                        sent = True
+                        yield chunk
+                return
+            except Exception as e:
+                print(f"❌ Fallback model {self.fallback.model} failed: {e!r}")
+                if sent:
+                    yield f"⚠️ Error: {str(e)}"
+                    return
+        yield self._error_message(error) if error is not None else BUSY_MESSAGE
+
+
+class ChatServiceUnavailable(Exception):
+    """The chat provider could not be initialized (e.g. missing API key)"""
+
+
+_service: Optional[AIChatService] = None
+
+
+def get_ai_chat_service() -> AIChatService:
+    """Return the shared chat service, creating it on first use.
+
+    Failures are not cached: a fixed config is picked up on the next call,
+    and only the chat endpoints are affected meanwhile.
+    """
+    global _service
+    if _service is None:
         try:
-            stream = self.client.chat.completions.create(
-                messages=messages,
-                model=self.model,
-                temperature=0.7,
-                max_tokens=500,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-                    
+            _service = AIChatService()
         except Exception as e:
-            yield f"⚠️ Error: {str(e)}"
+            print(f"❌ AIChatService unavailable: {e}")
+            raise ChatServiceUnavailable(str(e)) from e
+    return _service
+
+
+def peek_ai_chat_service() -> Optional[AIChatService]:
+    """The chat service if it has been created, without creating it"""
+    return _service
+
 
-ai_chat_service = AIChatService()
+async def close_ai_chat_service():
+    global _service
+    if _service is not None:
+        await _service.aclose()
+        _service = None
@@ -0,0 +1,111 @@
+import hashlib
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+import markdown
+import nh3
+from sqlalchemy import update
+
+from ..database import SessionLocal
+from ..models.blog import BlogPost
+
+# Bump when the output changes; posts re-render on their next save
+RENDERER_VERSION = 1
+WORDS_PER_MINUTE = 200
+
+_EXTENSIONS = ["fenced_code", "codehilite", "tables", "sane_lists", "toc", "nl2br"]
+_EXTENSION_CONFIGS = {
+    # Inline colors, so highlighted code needs no stylesheet on the frontend
+    "codehilite": {"noclasses": True, "pygments_style": "monokai", "guess_lang": False},
+}
+
+# Sanitizer allow-list: nh3's defaults plus what the renderer emits
+_ATTRIBUTES = {
+    **{tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()},
+    **{f"h{level}": {"id"} for level in range(1, 7)},  # TOC anchors
+    "div": {"class", "style"},
+    "pre": {"style"},
+    "span": {"style"},
+    "td": nh3.ALLOWED_ATTRIBUTES["td"] | {"style"},
+    "th": nh3.ALLOWED_ATTRIBUTES["th"] | {"style"},
+}
+_STYLE_PROPERTIES = {
+    "color", "background", "background-color", "font-weight", "font-style",
+    "text-decoration", "line-height", "text-align",
+}
+
+
+@dataclass
+class RenderedContent:
+    html: str
+    toc: List[Dict]
+    read_time: int
+    content_hash: str
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(f"{RENDERER_VERSION}:{content}".encode()).hexdigest()
+
+
+def _toc(tokens: List[Dict]) -> List[Dict]:
+    return [
+        {"id": token["id"], "title": token["name"], "level": token["level"], "children": _toc(token["children"])}
+        for token in tokens
+    ]
+
+
+def render(content: str) -> RenderedContent:
+    """Markdown (raw HTML allowed, newlines kept) -> sanitized HTML + TOC (CPU-bound)"""
+    md = markdown.Markdown(extensions=_EXTENSIONS, extension_configs=_EXTENSION_CONFIGS)
+    html = nh3.clean(
+        md.convert(content),
+        attributes=_ATTRIBUTES,
+        filter_style_properties=_STYLE_PROPERTIES,
+    )
+    words = len(re.findall(r"\w+", content))
+    return RenderedContent(
+        html=html,
+        toc=_toc(md.toc_tokens),
+        read_time=max(1, math.ceil(words / WORDS_PER_MINUTE)),
+        content_hash=content_hash(content),
+    )
+
+
+def is_stale(post: BlogPost) -> bool:
+    """Whether the stored rendering doesn't match the post's current content"""
+    return post.content_hash != content_hash(post.content)
+
+
+def apply(post: BlogPost, rendered: RenderedContent):
+    post.content_html = rendered.html
+    post.toc = rendered.toc
+    post.read_time = rendered.read_time
+    post.content_hash = rendered.content_hash
+
+
+def backfill(batch_size: int = 100) -> int:
+    """Render posts saved before pre-rendering existed (startup, blocking)"""
+    rendered = 0
+    with SessionLocal() as db:
+        while True:
+            posts = db.query(BlogPost.id, BlogPost.content) \
+                .filter(BlogPost.content_hash.is_(None)).limit(batch_size).all()
+            if not posts:
+                break
+            for post in posts:
+                result = render(post.content)
+                # Keeps updated_at as is - the post itself didn't change
+                db.execute(update(BlogPost).where(BlogPost.id == post.id).values(
+                    content_html=result.html,
+                    toc=result.toc,
+                    read_time=result.read_time,
+                    content_hash=result.content_hash,
+                    updated_at=BlogPost.updated_at,
+                ))
+            db.commit()
+            rendered += len(posts)
+    if rendered:
+        print(f"📝 Pre-rendered {rendered} blog post(s)")
+    return rendered
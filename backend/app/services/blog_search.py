@@ -0,0 +1,189 @@
+import html
+import re
+from typing import Dict, List
+
+from sqlalchemy import DateTime, text
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal, engine
+from ..models.blog import BlogPost
+
+# Full-text index over blog posts.
+# SQLite: an FTS5 table keyed by post id, written in the same transaction as
+# the admin change (not by triggers - view count flushes would rewrite it).
+# PostgreSQL: a GIN index on a weighted tsvector expression, which the
+# database keeps current by itself. Other databases fall back to LIKE.
+
+FTS_TABLE = "blog_posts_fts"
+
+# Must match the indexed expression exactly, or the planner won't use the index
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '') || ' ' || coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+)
+
+# Highlight markers - swapped for <mark> after the snippet is HTML-escaped
+_START, _STOP = "\x02", "\x03"
+
+_TIMESTAMP = DateTime(timezone=True)
+
+_available = False
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())[:10]
+
+
+def setup():
+    """Create the index; catch it up with posts written outside the admin API (startup, blocking)"""
+    global _available
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as connection:
+            if dialect == "sqlite":
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(title, excerpt, content, tags, tokenize='porter unicode61')"
+                ))
+            elif dialect == "postgresql":
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_blog_posts_search ON blog_posts USING GIN (({PG_DOCUMENT}))"
+                ))
+        _available = dialect in ("sqlite", "postgresql")
+    except Exception as e:
+        print(f"❌ Blog full-text index unavailable, search falls back to LIKE: {e}")
+        return
+
+    if dialect == "sqlite":
+        with SessionLocal() as db:
+            added, removed = sync_missing(db)
+            if added or removed:
+                print(f"🔎 Search index caught up: {added} post(s) added, {removed} deleted post(s) removed")
+
+
+def sync_missing(db: Session):
+    """Index posts the FTS table lacks and drop entries of deleted posts (SQLite).
+
+    Catches rows inserted or deleted by seed/import scripts or manual SQL;
+    edits made that way still need rebuild().
+    """
+    missing = [
+        row.id for row in db.execute(text(
+            f"SELECT id FROM blog_posts WHERE id NOT IN (SELECT rowid FROM {FTS_TABLE})"
+        ))
+    ]
+    for start in range(0, len(missing), 500):
+        for post in db.query(BlogPost).filter(BlogPost.id.in_(missing[start:start + 500])):
+            index_post(db, post)
+    removed = db.execute(text(
+        f"DELETE FROM {FTS_TABLE} WHERE rowid NOT IN (SELECT id FROM blog_posts)"
+    )).rowcount
+    db.commit()
+    return len(missing), removed
+
+
+def rebuild(db: Session) -> int:
+    """Re-index every post (SQLite)"""
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    posts = db.query(BlogPost).all()
+    for post in posts:
+        index_post(db, post)
+    db.commit()
+    return len(posts)
+
+
+def index_post(db: Session, post: BlogPost):
+    """Add or refresh a post; call in the transaction that writes it (after flush)"""
+    if not _available or _dialect(db) != "sqlite":
+        return
+    remove_post(db, post.id)
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content, tags) "
+             "VALUES (:id, :title, :excerpt, :content, :tags)"),
+        {"id": post.id, "title": post.title, "excerpt": post.excerpt or "",
+         "content": post.content, "tags": (post.tags or "").replace(",", " ")},
+    )
+
+
+def remove_post(db: Session, post_id: int):
+    if not _available or _dialect(db) != "sqlite":
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": post_id})
+
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def search(db: Session, query: str, limit: int, offset: int) -> Dict:
+    """Published posts matching every term (the last one as a prefix), best first"""
+    words = terms(query)
+    if not words:
+        return {"total": 0, "results": []}
+    dialect = _dialect(db) if _available else None
+    columns = "p.id, p.title, p.slug, p.excerpt, p.category, p.tags, p.image_url, p.views, p.created_at"
+    page = {"limit": limit, "offset": offset}
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        where = f"{FTS_TABLE} MATCH :match AND p.published = 1"
+        source = f"FROM {FTS_TABLE} JOIN blog_posts p ON p.id = {FTS_TABLE}.rowid"
+        params = {"match": match}
+        rows = db.execute(text(
+            f"SELECT {columns}, "
+            # Column weights: title, excerpt, content, tags
+            f"bm25({FTS_TABLE}, 10.0, 4.0, 1.0, 6.0) AS score, "
+            f"snippet({FTS_TABLE}, -1, '{_START}', '{_STOP}', '…', 24) AS snippet "
+            f"{source} WHERE {where} ORDER BY score LIMIT :limit OFFSET :offset"
+        ).columns(created_at=_TIMESTAMP), {**params, **page}).all()
+    elif dialect == "postgresql":
+        where = f"({PG_DOCUMENT}) @@ to_tsquery('english', :tsquery) AND p.published"
+        source = "FROM blog_posts p"
+        params = {"tsquery": " & ".join(words) + ":*"}
+        rows = db.execute(text(
+            f"SELECT {columns}, "
+            f"ts_rank_cd(({PG_DOCUMENT}), to_tsquery('english', :tsquery)) AS score, "
+            f"ts_headline('english', coalesce(p.excerpt, '') || ' ' || p.content, to_tsquery('english', :tsquery), "
+            f"'StartSel=\"{_START}\", StopSel=\"{_STOP}\", MaxWords=35, MinWords=15, MaxFragments=1') AS snippet "
+            f"{source} WHERE {where} ORDER BY score DESC, p.id DESC LIMIT :limit OFFSET :offset"
+        ).columns(created_at=_TIMESTAMP), {**params, **page}).all()
+    else:
+        # No full-text support: unranked substring match, newest first
+        likes = [f"%{word}%" for word in words]
+        clauses = " AND ".join(
+            f"(lower(p.title) LIKE :w{i} OR lower(p.excerpt) LIKE :w{i} OR lower(p.content) LIKE :w{i} "
+            f"OR lower(p.tags) LIKE :w{i})"
+            for i in range(len(likes))
+        )
+        where = f"{clauses} AND p.published = :published"
+        source = "FROM blog_posts p"
+        params = {**{f"w{i}": like for i, like in enumerate(likes)}, "published": True}
+        rows = db.execute(text(
+            f"SELECT {columns}, 0 AS score, p.excerpt AS snippet "
+            f"{source} WHERE {where} ORDER BY p.created_at DESC LIMIT :limit OFFSET :offset"
+        ).columns(created_at=_TIMESTAMP), {**params, **page}).all()
+
+    total = db.execute(text(f"SELECT count(*) {source} WHERE {where}"), params).scalar()
+    return {
+        "total": total,
+        "results": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "slug": row.slug,
+                "excerpt": row.excerpt,
+                "category": row.category,
+                "tags": row.tags.split(",") if row.tags else [],
+                "image_url": row.image_url,
+                "views": row.views,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "snippet": _highlight(row.snippet),
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.chat_message import ChatMessage
+from ..models.chat_rollup import ChatRollup
+
+GRANULARITIES = ("hour", "day")
+COUNTERS = ("sessions", "messages", "useful", "not_useful", "response_chars")
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if moment.tzinfo is None:  # SQLite returns naive UTC timestamps
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == "day" else moment
+
+
+def _vote_counter(is_useful: Optional[bool]) -> Optional[str]:
+    if is_useful is None:
+        return None
+    return "useful" if is_useful else "not_useful"
+
+
+class _Deltas:
+    """Counter increments grouped by (granularity, bucket_start)"""
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[str, datetime], Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    def add(self, moment: datetime, counter: str, amount: int = 1):
+        for granularity in GRANULARITIES:
+            self.buckets[(granularity, bucket_start(moment, granularity))][counter] += amount
+
+
+def _apply(db: Session, deltas: _Deltas):
+    """Add the deltas to the rollup rows, creating missing buckets (upsert)"""
+    dialect = db.get_bind().dialect.name
+    for (granularity, start), counts in deltas.buckets.items():
+        counts = {name: amount for name, amount in counts.items() if amount}
+        if not counts:
+            continue
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            values = {**dict.fromkeys(COUNTERS, 0), **counts}
+            stmt = insert(ChatRollup).values(granularity=granularity, bucket_start=start, **values)
+            # Atomic increment, so concurrent workers can't lose updates
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["granularity", "bucket_start"],
+                set_={name: getattr(ChatRollup, name) + stmt.excluded[name] for name in counts},
+            )
+            db.execute(stmt)
+        else:
+            row = db.query(ChatRollup).filter_by(granularity=granularity, bucket_start=start).with_for_update().first()
+            if row is None:
+                row = ChatRollup(granularity=granularity, bucket_start=start, **dict.fromkeys(COUNTERS, 0))
+                db.add(row)
+            for name, amount in counts.items():
+                setattr(row, name, getattr(row, name) + amount)
+
+
+def record_messages(db: Session, messages: List[ChatMessage]):
+    """Count freshly inserted (flushed) messages; call inside the inserting transaction"""
+    if not messages:
+        return
+    now = datetime.now(timezone.utc)
+    new_ids = [message.id for message in messages]
+    session_ids = {message.session_id for message in messages}
+    # A session "starts" in the bucket of its first stored message
+    returning = {
+        row.session_id for row in db.query(ChatMessage.session_id)
+        .filter(ChatMessage.session_id.in_(session_ids), ChatMessage.id.notin_(new_ids))
+        .distinct()
+    }
+    deltas = _Deltas()
+    for message in messages:
+        # created_at is a server default that isn't loaded after flush; "now" lands in the same bucket
+        moment = now
+        deltas.add(moment, "messages")
+        deltas.add(moment, "response_chars", len(message.bot_response or ""))
+        if message.session_id not in returning:
+            deltas.add(moment, "sessions")
+            returning.add(message.session_id)
+        counter = _vote_counter(message.is_useful)
+        if counter:
+            deltas.add(moment, counter)
+    _apply(db, deltas)
+
+
+def record_vote(db: Session, message: ChatMessage, previous: Optional[bool]):
+    """Move a message's vote between counters; call in the transaction that changes it"""
+    old, new = _vote_counter(previous), _vote_counter(message.is_useful)
+    if old == new:
+        return
+    deltas = _Deltas()
+    moment = message.created_at or datetime.now(timezone.utc)
+    if old:
+        deltas.add(moment, old, -1)
+    if new:
+        deltas.add(moment, new)
+    _apply(db, deltas)
+
+
+def rebuild() -> int:
+    """Recompute every bucket from chat_messages (backfill; blocking).
+
+    Only covers messages still stored - history already pruned by retention
+    survives in the rollups but not in a rebuild.
+    """
+    with SessionLocal() as db:
+        deltas = _Deltas()
+        first_seen = db.query(ChatMessage.session_id, func.min(ChatMessage.created_at).label("started")) \
+            .group_by(ChatMessage.session_id)
+        for row in first_seen:
+            deltas.add(row.started, "sessions")
+        rows = db.query(
+            ChatMessage.created_at, ChatMessage.is_useful, func.length(ChatMessage.bot_response).label("chars"),
+        ).yield_per(1000)
+        for row in rows:
+            deltas.add(row.created_at, "messages")
+            deltas.add(row.created_at, "response_chars", row.chars or 0)
+            counter = _vote_counter(row.is_useful)
+            if counter:
+                deltas.add(row.created_at, counter)
+        db.query(ChatRollup).delete(synchronize_session=False)
+        _apply(db, deltas)
+        db.commit()
+        return len(deltas.buckets)
+
+
+def backfill_if_empty():
+    """First start after upgrading: build rollups for messages written before they existed"""
+    with SessionLocal() as db:
+        if db.query(ChatRollup.id).first() is not None or db.query(ChatMessage.id).first() is None:
+            return
+    buckets = rebuild()
+    print(f"📊 Built {buckets} chat rollup bucket(s) from existing messages")
+
+
+def recent_buckets(db: Session, granularity: str, limit: int) -> List[Dict]:
+    """The newest `limit` buckets, newest first (an index range scan, not a table scan)"""
+    rows = db.query(ChatRollup).filter(ChatRollup.granularity == granularity) \
+        .order_by(ChatRollup.bucket_start.desc()).limit(limit).all()
+    return [
+        {
+            "bucket_start": bucket_start(row.bucket_start, granularity).isoformat(),
+            "sessions": row.sessions,
+            "messages": row.messages,
+            "useful": row.useful,
+            "not_useful": row.not_useful,
+            "avg_response_chars": round(row.response_chars / row.messages, 1) if row.messages else 0,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import func
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.chat_message import ChatMessage
+from ..models.llm_usage import LLMUsage
+from .conversation_store import conversation_store
+
+
+class ChatRetention:
+    """Archives and prunes chat sessions that have been idle past the TTL.
+
+    A session expires when its newest message is older than `retention_days`.
+    Expired rows are appended to a gzip NDJSON archive (one file per month,
+    append-only) and only then deleted, `batch_size` rows per transaction,
+    so the hot table stays small without losing history.
+    """
+
+    def __init__(self, retention_days: int, batch_size: int, archive_dir: str,
+                 interval: float, sessions_per_run: int = 1000):
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.sessions_per_run = sessions_per_run
+        self.last_run: Dict = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    def run_once(self) -> Dict:
+        """One retention pass (blocking - run it in a worker thread)"""
+        if not self.enabled:
+            return {"enabled": False}
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        archived = 0
+        with SessionLocal() as db:
+            # Served by the (session_id, created_at) index
+            sessions = [
+                row.session_id for row in db.query(ChatMessage.session_id)
+                .group_by(ChatMessage.session_id)
+                .having(func.max(ChatMessage.created_at) < cutoff)
+                .limit(self.sessions_per_run)
+            ]
+
+            for start in range(0, len(sessions), 100):
+                chunk = sessions[start:start + 100]
+                last_id = 0
+                while True:
+                    rows = db.query(ChatMessage).filter(
+                        ChatMessage.session_id.in_(chunk),
+                        ChatMessage.id > last_id,
+                    ).order_by(ChatMessage.id).limit(self.batch_size).all()
+                    if not rows:
+                        break
+
+                    # Archive first, delete second: a crash can duplicate
+                    # archive lines but never lose a message
+                    self._archive(rows)
+                    last_id = rows[-1].id
+                    row_ids = [row.id for row in rows]
+                    # SQLite doesn't enforce the cascade, so delete usage rows explicitly
+                    db.query(LLMUsage).filter(
+                        LLMUsage.chat_message_id.in_(row_ids)
+                    ).delete(synchronize_session=False)
+                    db.query(ChatMessage).filter(
+                        ChatMessage.id.in_(row_ids)
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                    db.expunge_all()
+                    archived += len(rows)
+
+                for session_id in chunk:
+                    conversation_store.invalidate(session_id)
+
+        self.last_run = {
+            "enabled": True,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "cutoff": cutoff.isoformat(),
+            "sessions": len(sessions),
+            "messages": archived,
+        }
+        if archived:
+            print(f"🗄️  Archived {archived} chat message(s) from {len(sessions)} expired session(s)")
+        return self.last_run
+
+    def _archive(self, rows: List[ChatMessage]):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(
+            self.archive_dir,
+            f"chat-archive-{datetime.now(timezone.utc):%Y-%m}.ndjson.gz",
+        )
+        lines = [
+            json.dumps({
+                "id": row.id,
+                "session_id": row.session_id,
+                "turn_id": row.turn_id,
+                "user_message": row.user_message,
+                "bot_response": row.bot_response,
+                "is_useful": row.is_useful,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }, ensure_ascii=False)
+            for row in rows
+        ]
+        # Each append adds a gzip member; gzip readers concatenate them
+        with gzip.open(path, "at", encoding="utf-8") as archive:
+            archive.write("\n".join(lines) + "\n")
+            archive.flush()
+            os.fsync(archive.fileno())
+
+    async def run_forever(self):
+        """Periodic background job (started from the app lifespan)"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"❌ Chat retention run failed: {e}")
+
+
+chat_retention = ChatRetention(
+    retention_days=settings.CHAT_RETENTION_DAYS,
+    batch_size=settings.CHAT_RETENTION_BATCH,
+    archive_dir=settings.CHAT_ARCHIVE_DIR,
+    interval=settings.CHAT_RETENTION_INTERVAL,
+)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.chat_message import ChatMessage
+from ..models.llm_usage import LLMUsage
+from . import chat_analytics
+from .llm_metrics import LLMCall
+
+# Queued by stop() behind all pending rows
+_STOP = object()
+
+
+class ChatWriteBehind:
+    """Persists chat turns off the request path, batched into multi-row transactions.
+
+    Handlers enqueue finished turns and move on; a background task collects up
+    to `max_batch` rows (or whatever arrived within `flush_interval` seconds)
+    and writes them in one short-lived session on a worker thread. A bounded
+    queue makes producers wait if the database falls behind.
+    """
+
+    def __init__(self, max_batch: int, flush_interval: float, max_pending: int, retries: int = 3):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.max_pending = max_pending
+        # Created by start(): queues are bound to the event loop that first uses them
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Turns queued but not committed yet, set once their batch is done
+        self._unwritten: Dict[str, asyncio.Event] = {}
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the writer"""
+        if self._task is None:
+            return
+        try:
+            # Queued after every pending row, so the writer drains them first
+            await self._queue.put(_STOP)
+            await self._task
+        finally:
+            self._task = None
+            self._queue = None
+
+    async def enqueue(self, user_message: str, bot_response: str, session_id: str,
+                      llm_calls: Sequence[LLMCall] = (), turn_id: Optional[str] = None):
+        record = {
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "session_id": session_id,
+            "turn_id": turn_id,
+            "llm_calls": list(llm_calls),
+        }
+        if turn_id:
+            self._unwritten[turn_id] = asyncio.Event()
+        if self._task is None:
+            # Writer not running (scripts, no lifespan) - write straight through
+            await self._flush([record])
+            return
+        await self._queue.put(record)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict]):
+        for attempt in range(1, self.retries + 1):
+            try:
+                await asyncio.to_thread(self._write, batch)
+                self.written += len(batch)
+                self.batches += 1
+                break
+            except Exception as e:
+                print(f"❌ Chat write-behind failed (attempt {attempt}/{self.retries}, {len(batch)} rows): {e}")
+                await asyncio.sleep(0.5 * attempt)
+        else:
+            self.dropped += len(batch)
+        for record in batch:
+            event = self._unwritten.pop(record["turn_id"], None) if record["turn_id"] else None
+            if event:
+                event.set()
+
+    async def wait_written(self, turn_id: str, timeout: float) -> bool:
+        """Wait until a turn queued by this worker is stored (or dropped).
+        False if it isn't queued here - already written, or never seen."""
+        event = self._unwritten.get(turn_id)
+        if event is None:
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return True
+
+    @staticmethod
+    def _write(batch: List[Dict]):
+        with SessionLocal() as db:
+            messages = [
+                ChatMessage(
+                    user_message=record["user_message"],
+                    bot_response=record["bot_response"],
+                    session_id=record["session_id"],
+                    turn_id=record["turn_id"],
+                )
+                for record in batch
+            ]
+            db.add_all(messages)
+            # Assigns message ids for the usage rows, same transaction
+            db.flush()
+            chat_analytics.record_messages(db, messages)
+            db.add_all([
+                LLMUsage(
+                    chat_message_id=message.id,
+                    model=call.model,
+                    ok=call.ok,
+                    prompt_tokens=call.prompt_tokens,
+                    completion_tokens=call.completion_tokens,
+                    ttft_ms=call.ttft_ms,
+                    latency_ms=call.latency_ms,
+                    created_at=call.created_at,
+                )
+                for message, record in zip(messages, batch)
+                for call in record["llm_calls"]
+            ])
+            db.commit()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+chat_writer = ChatWriteBehind(
+    max_batch=settings.CHAT_WRITE_BATCH,
+    flush_interval=settings.CHAT_WRITE_INTERVAL,
+    max_pending=settings.CHAT_WRITE_QUEUE,
+)
@@ -0,0 +1,101 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted list (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """Trips when the upstream starts failing or slowing down.
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are recorded, the breaker opens if the error rate reaches `error_rate`
+    or the p95 latency exceeds `latency_ms`. While open, callers skip the
+    upstream entirely; after `open_seconds` one probe call is let through
+    (half-open) and its outcome decides whether the breaker closes again.
+    """
+
+    def __init__(self, window: int, min_calls: int, error_rate: float,
+                 latency_ms: float, open_seconds: float):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency = latency_ms / 1000
+        self.open_seconds = open_seconds
+        self._calls: deque = deque(maxlen=window)  # (ok, latency seconds)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether the next call may go to the upstream"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, latency: float):
+        """Outcome of a call that allow() let through"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok and latency <= self.latency:
+                print("✅ Upstream recovered - circuit closed")
+                self.state = CLOSED
+                self._calls.clear()
+            else:
+                self._open()
+            return
+
+        self._calls.append((ok, latency))
+        if self.state == CLOSED and len(self._calls) >= self.min_calls:
+            errors = sum(1 for call_ok, _ in self._calls if not call_ok)
+            p95 = percentile([call_latency for _, call_latency in self._calls], 95)
+            if errors / len(self._calls) >= self.error_rate or p95 > self.latency:
+                self._open()
+
+    def abandon(self):
+        """A let-through call was cancelled before it had an outcome"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def _open(self):
+        if self.state != OPEN:
+            print(f"❌ Upstream degraded - circuit open for {self.open_seconds:.0f}s")
+            self.opened += 1
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        latencies = [latency for _, latency in self._calls]
+        errors = sum(1 for ok, _ in self._calls if not ok)
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "state": self.state,
+            "calls": len(self._calls),
+            "error_rate": round(errors / len(self._calls), 3) if self._calls else 0,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,124 @@
+import math
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple
+
+# Rough per-message framing cost (role, separators) in chat templates
+MESSAGE_OVERHEAD_TOKENS = 4
+COMPACT_MARKER = " …[trimmed]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return math.ceil(len(text) / 4) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextStats:
+    """Prompt size accounting for one request"""
+    budget: int
+    system_tokens: int = 0
+    history_tokens: int = 0
+    user_tokens: int = 0
+    turns_kept: int = 0
+    turns_compacted: int = 0
+    turns_dropped: int = 0
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.system_tokens + self.history_tokens + self.user_tokens
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "prompt_tokens": self.prompt_tokens}
+
+
+class ContextAssembler:
+    """Builds the message list for a completion within a token budget.
+
+    The system prompt and the new user message are always sent. History is
+    added newest turn first: the most recent `recent_turns` turns go in
+    verbatim, older turns are compacted to `compact_tokens` per message, and
+    once a turn no longer fits it and everything older are dropped.
+    """
+
+    def __init__(self, budget: int, compact_tokens: int, recent_turns: int):
+        self.budget = budget
+        self.compact_tokens = compact_tokens
+        self.recent_turns = recent_turns
+
+    def build(self, system_prompt: str, user_message: str, history: List[Dict] = None) -> Tuple[List[Dict], ContextStats]:
+        stats = ContextStats(
+            budget=self.budget,
+            system_tokens=estimate_tokens(system_prompt),
+            user_tokens=estimate_tokens(user_message),
+        )
+        remaining = self.budget - stats.system_tokens - stats.user_tokens
+
+        turns = self._group_turns(history or [])
+        kept: List[List[Dict]] = []
+        for age, turn in enumerate(reversed(turns)):
+            compacted = False
+            if age >= self.recent_turns:
+                shortened = [self._compact(msg) for msg in turn]
+                compacted = any(new is not old for new, old in zip(shortened, turn))
+                turn = shortened
+            cost = sum(estimate_tokens(msg["content"]) for msg in turn)
+            if cost > remaining:
+                stats.turns_dropped = len(turns) - age
+                break
+            remaining -= cost
+            stats.history_tokens += cost
+            stats.turns_compacted += compacted
+            kept.append(turn)
+        stats.turns_kept = len(kept)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        for turn in reversed(kept):
+            messages.extend(turn)
+        messages.append({"role": "user", "content": user_message})
+        return messages, stats
+
+    def _compact(self, msg: Dict) -> Dict:
+        limit = self.compact_tokens * 4
+        content = msg["content"]
+        if len(content) <= limit:
+            return msg
+        return {"role": msg["role"], "content": content[:limit].rstrip() + COMPACT_MARKER}
+
+    @staticmethod
+    def _group_turns(history: List[Dict]) -> List[List[Dict]]:
+        # A turn starts at each user message and carries the replies after it
+        turns: List[List[Dict]] = []
+        for msg in history:
+            if msg["role"] == "user" or not turns:
+                turns.append([msg])
+            else:
+                turns[-1].append(msg)
+        return turns
+
+
+class ContextMetrics:
+    """Recent per-request context stats plus running totals"""
+
+    def __init__(self, recent: int = 100):
+        self.recent: deque = deque(maxlen=recent)
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.turns_dropped = 0
+        self.turns_compacted = 0
+
+    def record(self, stats: ContextStats):
+        self.recent.append(stats.to_dict())
+        self.requests += 1
+        self.prompt_tokens += stats.prompt_tokens
+        self.turns_dropped += stats.turns_dropped
+        self.turns_compacted += stats.turns_compacted
+
+    def snapshot(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0,
+            "turns_dropped": self.turns_dropped,
+            "turns_compacted": self.turns_compacted,
+            "recent": list(self.recent),
+        }
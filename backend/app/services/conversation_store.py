@@ -0,0 +1,78 @@
+from collections import deque
+from typing import Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.chat_message import ChatMessage
+from ..utils.ttl_cache import TTLCache
+
+
+class ConversationStore:
+    """Per-session rolling window of recent chat turns, cached in memory.
+
+    A miss loads the latest turns from the database once; after that each
+    turn is appended in place, so steady-state chats never query history.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float, max_turns: int):
+        self.max_turns = max_turns
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def get_history(self, db: AsyncSession, session_id: str) -> List[Dict]:
+        """Recent turns as chat messages, oldest first"""
+        turns = self._sessions.get(session_id)
+        if turns is None:
+            self.misses += 1
+            turns = await self._load(db, session_id)
+            self._sessions.set(session_id, turns)
+        else:
+            self.hits += 1
+        return self._to_messages(turns)
+
+    def append(self, session_id: str, user_message: str, bot_response: str):
+        """Record a finished turn in the cached window (no-op if not cached)"""
+        turns = self._sessions.get(session_id)
+        if turns is None:
+            # Not cached - the next read loads it from the database
+            return
+        turns.append((user_message, bot_response))
+        self._sessions.set(session_id, turns)  # refresh TTL
+
+    def invalidate(self, session_id: str):
+        self._sessions.pop(session_id)
+
+    def stats(self) -> Dict:
+        return {"sessions": len(self._sessions), "hits": self.hits, "misses": self.misses}
+
+    async def _load(self, db: AsyncSession, session_id: str) -> deque:
+        # Newest first so LIMIT keeps the latest turns, then restore order
+        rows = (await db.execute(
+            select(ChatMessage.user_message, ChatMessage.bot_response)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(self.max_turns)
+        )).all()
+
+        return deque(
+            ((msg.user_message, msg.bot_response) for msg in reversed(rows)),
+            maxlen=self.max_turns,
+        )
+
+    @staticmethod
+    def _to_messages(turns) -> List[Dict]:
+        conversation_history = []
+        for user_message, bot_response in turns:
+            conversation_history.append({"role": "user", "content": user_message})
+            conversation_history.append({"role": "assistant", "content": bot_response})
+        return conversation_history
+
+
+conversation_store = ConversationStore(
+    max_sessions=settings.CHAT_HISTORY_CACHE_SESSIONS,
+    ttl=settings.CHAT_HISTORY_TTL,
+    max_turns=settings.CHAT_HISTORY_TURNS,
+)
@@ -0,0 +1,104 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .circuit_breaker import percentile
+from .llm_providers import Usage
+
+# Calls made on behalf of the current chat turn (see LLMMetrics.capture)
+_captured: ContextVar[Optional[List["LLMCall"]]] = ContextVar("llm_calls", default=None)
+
+
+@dataclass
+class LLMCall:
+    """Token usage and timing of one upstream completion"""
+    model: str
+    ok: bool = True
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    ttft_ms: Optional[float] = None       # streams only
+    latency_ms: Optional[float] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started: float = field(default_factory=time.monotonic, repr=False)
+
+    def first_token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.monotonic() - self.started) * 1000
+
+    def finish(self, ok: bool, usage: Usage) -> "LLMCall":
+        self.latency_ms = (time.monotonic() - self.started) * 1000
+        self.ok = ok
+        self.prompt_tokens = usage.prompt_tokens
+        self.completion_tokens = usage.completion_tokens
+        return self
+
+    @property
+    def wait_seconds(self) -> float:
+        """How long the visitor waited for something to show up"""
+        return (self.ttft_ms if self.ttft_ms is not None else self.latency_ms or 0) / 1000
+
+
+def summarize(calls: Iterable) -> Dict[str, Dict]:
+    """Per-model aggregates of LLMCall objects or LLMUsage rows"""
+    by_model: Dict[str, List] = {}
+    for call in calls:
+        by_model.setdefault(call.model, []).append(call)
+
+    def pcts(values):
+        return {f"p{p}": round(v, 1) if (v := percentile(values, p)) is not None else None for p in (50, 95, 99)}
+
+    summary = {}
+    for model, model_calls in by_model.items():
+        ok_calls = [c for c in model_calls if c.ok]
+        generated = [c for c in ok_calls if c.completion_tokens and c.latency_ms]
+        # Decode speed: tokens over the time spent generating (after the first token)
+        generation_seconds = sum((c.latency_ms - (c.ttft_ms or 0)) / 1000 for c in generated)
+        completion_tokens = sum(c.completion_tokens for c in generated)
+        summary[model] = {
+            "calls": len(model_calls),
+            "errors": len(model_calls) - len(ok_calls),
+            "prompt_tokens": sum(c.prompt_tokens or 0 for c in model_calls),
+            "completion_tokens": sum(c.completion_tokens or 0 for c in model_calls),
+            "latency_ms": pcts([c.latency_ms for c in ok_calls if c.latency_ms is not None]),
+            "ttft_ms": pcts([c.ttft_ms for c in ok_calls if c.ttft_ms is not None]),
+            "tokens_per_sec": round(completion_tokens / generation_seconds, 1) if generation_seconds > 0 else None,
+        }
+    return summary
+
+
+class LLMMetrics:
+    """In-process record of recent upstream calls.
+
+    Every call AIChatService makes lands here. Chat handlers wrap a turn in
+    capture() to also collect that turn's calls, which are then stored next
+    to the ChatMessage row. Calls answered from a cache or shared with a
+    concurrent identical request cost nothing and are not attributed.
+    """
+
+    def __init__(self, recent: int = 1000):
+        self._recent: deque = deque(maxlen=recent)
+
+    @contextmanager
+    def capture(self) -> Iterator[List[LLMCall]]:
+        calls: List[LLMCall] = []
+        token = _captured.set(calls)
+        try:
+            yield calls
+        finally:
+            _captured.reset(token)
+
+    def record(self, call: LLMCall):
+        self._recent.append(call)
+        calls = _captured.get()
+        if calls is not None:
+            calls.append(call)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return summarize(self._recent)
+
+
+llm_metrics = LLMMetrics()
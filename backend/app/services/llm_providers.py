@@ -0,0 +1,195 @@
+import asyncio
+import copy
+from abc import ABC, abstractmethod
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+from ..config import settings
+from .context_window import estimate_tokens
+
+
+class LLMProviderError(Exception):
+    """Upstream completion failed"""
+
+
+@dataclass
+class Usage:
+    """Token counts for one call, filled in by the provider when known"""
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class LLMProvider(ABC):
+    """Chat-completion backend used by AIChatService"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int,
+                       usage: Optional[Usage] = None) -> str:
+        """The full reply; fills `usage` when the backend reports it"""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict], temperature: float, max_tokens: int,
+               usage: Optional[Usage] = None) -> AsyncIterator[str]:
+        """The reply as text deltas (an async generator)"""
+
+    def with_model(self, model: str) -> "LLMProvider":
+        """Same backend and connection pool, different model (e.g. a fallback)"""
+        sibling = copy.copy(self)
+        sibling.model = model
+        return sibling
+
+    async def aclose(self):
+        pass
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, model: str):
+        if not settings.GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY not found in settings!")
+        super().__init__(model)
+
+        import httpx
+        from groq import AsyncGroq
+
+        # One shared connection pool per worker, so completions reuse warm
+        # TLS connections instead of handshaking on every request
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.CHAT_READ_TIMEOUT, connect=settings.CHAT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.CHAT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CHAT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.CHAT_KEEPALIVE_EXPIRY,
+            ),
+        )
+        self.client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            max_retries=settings.CHAT_MAX_RETRIES,
+            http_client=self.http_client,
+        )
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int,
+                       usage: Optional[Usage] = None) -> str:
+        chat_completion = await self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        _copy_usage(chat_completion.usage, usage)
+        return chat_completion.choices[0].message.content
+
+    async def stream(self, messages: List[Dict], temperature: float, max_tokens: int,
+                     usage: Optional[Usage] = None) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            # Groq reports usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None:
+                _copy_usage(x_groq.usage, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        await self.client.close()
+
+
+def _copy_usage(reported, usage: Optional[Usage]):
+    if reported is not None and usage is not None:
+        usage.prompt_tokens = reported.prompt_tokens
+        usage.completion_tokens = reported.completion_tokens
+
+
+STUB_WORDS = (
+    "Digital Empire spans AI/ML, web development, blockchain and gaming projects. "
+    "EmpireBot can walk you through computer vision work, FastAPI backends, React "
+    "frontends, smart contracts and browser games built across the portfolio."
+).split()
+
+
+class StubProvider(LLMProvider):
+    """Offline backend with realistic timing for load tests.
+
+    Replies are derived from the prompt, so the same request always gets the
+    same text. Timing follows `latency_ms` to the first token and then
+    `tokens_per_sec`; `error_rate` injects upstream failures (seeded, so a
+    run is reproducible).
+    """
+
+    name = "stub"
+
+    def __init__(self, model: str, latency_ms: float, tokens_per_sec: float,
+                 response_tokens: int, error_rate: float, seed: int):
+        super().__init__(model)
+        self.latency = latency_ms / 1000
+        self.tokens_per_sec = tokens_per_sec
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def _reply_tokens(self, messages: List[Dict], max_tokens: int) -> List[str]:
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        start = digest[0] % len(STUB_WORDS)
+        count = min(self.response_tokens, max_tokens)
+        words = [f"(stub reply to: {prompt[:40]})"]
+        words += [STUB_WORDS[(start + i) % len(STUB_WORDS)] for i in range(count - 1)]
+        return [word + " " for word in words]
+
+    def _maybe_fail(self):
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise LLMProviderError("stub injected upstream error (rate_limit)")
+
+    @staticmethod
+    def _report_usage(messages: List[Dict], tokens: List[str], usage: Optional[Usage]):
+        if usage is not None:
+            usage.prompt_tokens = sum(estimate_tokens(msg["content"]) for msg in messages)
+            usage.completion_tokens = len(tokens)
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int,
+                       usage: Optional[Usage] = None) -> str:
+        tokens = self._reply_tokens(messages, max_tokens)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_sec)
+        self._maybe_fail()
+        self._report_usage(messages, tokens, usage)
+        return "".join(tokens).rstrip()
+
+    async def stream(self, messages: List[Dict], temperature: float, max_tokens: int,
+                     usage: Optional[Usage] = None) -> AsyncIterator[str]:
+        tokens = self._reply_tokens(messages, max_tokens)
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        for token in tokens:
+            yield token
+            await asyncio.sleep(1 / self.tokens_per_sec)
+        self._report_usage(messages, tokens, usage)
+
+
+def create_provider(name: str) -> LLMProvider:
+    """Build the configured backend (CHAT_PROVIDER)"""
+    if name == "groq":
+        return GroqProvider(model=settings.GROQ_MODEL)
+    if name == "stub":
+        return StubProvider(
+            model="stub",
+            latency_ms=settings.STUB_LATENCY_MS,
+            tokens_per_sec=settings.STUB_TOKENS_PER_SEC,
+            response_tokens=settings.STUB_RESPONSE_TOKENS,
+            error_rate=settings.STUB_ERROR_RATE,
+            seed=settings.STUB_SEED,
+        )
+    raise ValueError(f"Unknown CHAT_PROVIDER: {name!r} (expected 'groq' or 'stub')")
@@ -0,0 +1,246 @@
+import asyncio
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.blog import BlogPost
+from ..models.project import Project
+from ..models.resume import ResumeData
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me "
+    "my of on or so that the their them there this to was what when where which "
+    "who why will with you your about tell".split()
+)
+PASSAGE_CHARS = 800
+MIN_RELATIVE_SCORE = 0.3  # results scoring below this share of the best are dropped
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass
+class Document:
+    doc_id: str
+    title: str
+    text: str
+    length: int
+
+
+class RetrievalIndex:
+    """In-memory BM25 inverted index over portfolio content.
+
+    Projects, published blog posts (split into passages) and resume sections
+    are indexed as small documents so the chat prompt only carries the few
+    passages that match the question. Admin routes keep it current by calling
+    the index_*/remove_* helpers after each write. Each worker process has its
+    own index and only sees its own writes, so the app lifespan also rebuilds
+    it every CHAT_RETRIEVAL_REFRESH_INTERVAL seconds (refresh_forever) to pick
+    up edits made through other workers.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Document] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    # ---- core index operations ----
+
+    def upsert(self, doc_id: str, title: str, text: str):
+        terms = Counter(tokenize(f"{title} {text}"))
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._docs[doc_id] = Document(doc_id, title, text, sum(terms.values()))
+            self._total_length += self._docs[doc_id].length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def remove_prefix(self, prefix: str):
+        with self._lock:
+            for doc_id in [d for d in self._docs if d.startswith(prefix)]:
+                self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc.length
+        for term in set(tokenize(f"{doc.title} {doc.text}")):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[float, Document]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n or 1
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length = self._docs[doc_id].length
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not best:
+                return []
+            # Drop weak tail matches that would only pad the prompt
+            floor = best[0][1] * MIN_RELATIVE_SCORE
+            return [(score, self._docs[doc_id]) for doc_id, score in best if score >= floor]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ---- content adapters ----
+
+    def index_project(self, project: Project):
+        tech = ", ".join(project.tech or [])
+        self.upsert(
+            f"project:{project.id}",
+            f"Project: {project.name}",
+            f"{project.description or ''} Category: {project.category}. "
+            f"Status: {project.status}. Tech: {tech}.",
+        )
+
+    def remove_project(self, project_id: int):
+        self.remove(f"project:{project_id}")
+
+    def index_post(self, post: BlogPost):
+        self.remove_post(post.id)
+        if not post.published:
+            return
+        title = f"Blog post: {post.title}"
+        header = f"{post.excerpt or ''} Tags: {post.tags or ''}."
+        passages = _split_passages(post.content or "")
+        self.upsert(f"blog:{post.id}:0", title, f"{header} {passages[0] if passages else ''}")
+        for number, passage in enumerate(passages[1:], start=1):
+            self.upsert(f"blog:{post.id}:{number}", title, passage)
+
+    def remove_post(self, post_id: int):
+        self.remove_prefix(f"blog:{post_id}:")
+
+    def index_resume(self, resume):
+        """Index a ResumeData row or a plain resume dict (e.g. the default data)"""
+        data = resume if isinstance(resume, dict) else {
+            column.name: getattr(resume, column.name) for column in ResumeData.__table__.columns
+        }
+        self.clear_resume()
+        name = data.get("full_name", "")
+        self.upsert("resume:summary", f"About {name}", f"{data.get('title') or ''}. {data.get('summary') or ''} "
+                    f"Location: {data.get('location') or ''}.")
+        for i, job in enumerate(data.get("experience") or []):
+            details = job.get("description") or job.get("responsibilities") or []
+            self.upsert(
+                f"resume:experience:{i}",
+                f"Experience: {job.get('title', '')} at {job.get('company', '')}",
+                f"{job.get('start_date', '')} - {job.get('end_date', '')}. " + " ".join(_as_list(details)),
+            )
+        for i, item in enumerate(data.get("education") or []):
+            self.upsert(
+                f"resume:education:{i}",
+                f"Education: {item.get('degree', '')}",
+                f"{item.get('institution', '')} {item.get('start_date', '')}-{item.get('end_date', '')}. "
+                + " ".join(_as_list(item.get("achievements"))),
+            )
+        for category, skills in (data.get("skills") or {}).items():
+            self.upsert(f"resume:skills:{category}", f"Skills: {category}", ", ".join(_as_list(skills)))
+        for i, project in enumerate(data.get("projects") or []):
+            self.upsert(
+                f"resume:project:{i}",
+                f"Project: {project.get('name', '')}",
+                f"{project.get('description', '')} Tech: {', '.join(_as_list(project.get('technologies')))}. "
+                + " ".join(_as_list(project.get("highlights"))),
+            )
+        for i, cert in enumerate(data.get("certifications") or []):
+            self.upsert(
+                f"resume:certification:{i}",
+                f"Certification: {cert.get('name', '')}",
+                f"{cert.get('issuer', '')} {cert.get('date', '')}. {cert.get('description', '')}",
+            )
+
+    def clear_resume(self):
+        self.remove_prefix("resume:")
+
+    def rebuild(self, default_resume: Optional[dict] = None):
+        """Full rebuild from the database (startup)"""
+        with SessionLocal() as db:
+            fresh = RetrievalIndex(self.k1, self.b)
+            for project in db.query(Project).all():
+                fresh.index_project(project)
+            for post in db.query(BlogPost).filter(BlogPost.published == True).all():
+                fresh.index_post(post)
+            resume = db.query(ResumeData).first()
+            if resume is not None:
+                fresh.index_resume(resume)
+            elif default_resume:
+                fresh.index_resume(default_resume)
+        with self._lock:
+            self._docs, self._postings, self._total_length = fresh._docs, fresh._postings, fresh._total_length
+
+    async def refresh_forever(self, interval: float, default_resume: Optional[dict] = None):
+        """Periodic full rebuild (started from the app lifespan)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.rebuild, default_resume)
+            except Exception as e:
+                print(f"❌ Retrieval index refresh failed: {e}")
+
+    def context_for(self, query: str) -> str:
+        """Top-k matching snippets formatted for the system prompt ('' if none)"""
+        results = self.search(query, settings.CHAT_RETRIEVAL_TOP_K)
+        limit = settings.CHAT_RETRIEVAL_SNIPPET_CHARS
+        snippets = []
+        for _, doc in results:
+            text = doc.text if len(doc.text) <= limit else doc.text[:limit].rsplit(" ", 1)[0] + " …"
+            snippets.append(f"- {doc.title}: {text}")
+        return "\n".join(snippets)
+
+
+def _as_list(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def _split_passages(content: str) -> List[str]:
+    """Group paragraphs into passages of roughly PASSAGE_CHARS characters"""
+    passages, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", content):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > PASSAGE_CHARS:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+
+retrieval_index = RetrievalIndex()
@@ -0,0 +1,103 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .streaming import ReplayBuffer
+
+T = TypeVar("T")
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.buffer = ReplayBuffer()
+        self.readers = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """Collapses concurrent identical requests into one in-flight upstream call.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same result (or follow the same stream). Keys are
+    released as soon as the call finishes, so later requests start fresh.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Optional[str], fn: Callable[[], Awaitable[T]]) -> T:
+        if key is None:
+            return await fn()
+
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._release_call(key, t))
+        else:
+            self.shared += 1
+
+        # Shield: one caller disconnecting must not cancel the call for the rest
+        return await asyncio.shield(task)
+
+    def stream(self, key: Optional[str], fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Follow the shared upstream stream for `key`, starting it if needed"""
+        if key is None:
+            return fn()
+
+        flight = self._streams.get(key)
+        if flight is None:
+            self.started += 1
+            flight = _StreamFlight()
+            flight.task = asyncio.create_task(self._pump(fn(), flight.buffer))
+            flight.task.add_done_callback(lambda t: self._release_stream(key, flight))
+            self._streams[key] = flight
+        else:
+            self.shared += 1
+        # Count the reader now, not on first iteration, so a leader leaving
+        # early can't cancel a stream that a new subscriber is about to read
+        flight.readers += 1
+        return self._follow(key, flight)
+
+    async def _pump(self, source: AsyncIterator[str], buffer: ReplayBuffer):
+        try:
+            async for chunk in source:
+                await buffer.append(chunk)
+        except asyncio.CancelledError:
+            await buffer.finish(RuntimeError("upstream stream cancelled"))
+            raise
+        except Exception as e:
+            await buffer.finish(e)
+        else:
+            await buffer.finish()
+
+    async def _follow(self, key: str, flight: _StreamFlight) -> AsyncIterator[str]:
+        try:
+            async for chunk in flight.buffer.follow():
+                yield chunk
+        finally:
+            flight.readers -= 1
+            if flight.readers == 0 and not flight.buffer.done:
+                # Every subscriber left - stop paying for the upstream call
+                self._release_stream(key, flight)
+                flight.task.cancel()
+
+    def _release_call(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; callers already saw it
+
+    def _release_stream(self, key: str, flight: _StreamFlight):
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "started": self.started,
+            "shared": self.shared,
+        }
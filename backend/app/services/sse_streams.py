@@ -0,0 +1,121 @@
+import asyncio
+import json
+import uuid
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from ..config import settings
+from ..utils.ttl_cache import TTLCache
+from .admission import AdmissionRejected
+from .streaming import ReplayBuffer
+
+
+def format_event(data: Dict, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Serialize one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class SSEStream:
+    """One reply; its stream id doubles as the turn id clients vote by"""
+
+    def __init__(self, stream_id: str, session_id: str):
+        self.stream_id = stream_id
+        self.session_id = session_id
+        self.buffer = ReplayBuffer()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SSEStreamRegistry:
+    """Short-lived server-side buffers that make SSE replies resumable.
+
+    Each reply is produced once into a ReplayBuffer kept for `ttl` seconds.
+    Event ids are "<stream_id>:<seq>", so a client that reconnects with
+    Last-Event-ID picks up right after the last chunk it received, even if
+    the reply finished while it was away.
+    """
+
+    def __init__(self, max_streams: int, ttl: float, heartbeat: float):
+        self.heartbeat = heartbeat
+        self._streams = TTLCache(maxsize=max_streams, ttl=ttl)
+
+    def create(self, session_id: str) -> SSEStream:
+        stream = SSEStream(uuid.uuid4().hex, session_id)
+        self._streams.set(stream.stream_id, stream)
+        return stream
+
+    def touch(self, stream: SSEStream):
+        """Restart the TTL (e.g. when a reply finishes)"""
+        self._streams.set(stream.stream_id, stream)
+
+    def resume(self, last_event_id: Optional[str]) -> Tuple[Optional[SSEStream], int]:
+        """Stream and chunk position for a Last-Event-ID header, if still buffered"""
+        if not last_event_id or ":" not in last_event_id:
+            return None, 0
+        stream_id, _, seq = last_event_id.partition(":")
+        stream = self._streams.get(stream_id)
+        if stream is None or not seq.isdigit():
+            return None, 0
+        return stream, int(seq)
+
+    async def events(self, stream: SSEStream, start: int = 0) -> AsyncIterator[str]:
+        """Render buffered + live chunks as SSE, with heartbeat comments while idle"""
+        if start == 0:
+            yield format_event(
+                {"session_id": stream.session_id, "stream_id": stream.stream_id, "turn_id": stream.stream_id},
+                event="start", event_id=f"{stream.stream_id}:0",
+            )
+
+        chunks = stream.buffer.follow(start)
+        seq = start
+        pending = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(chunks.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=self.heartbeat)
+                if not done:
+                    # Comment line: keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                try:
+                    content = pending.result()
+                except StopAsyncIteration:
+                    break
+                except AdmissionRejected as e:
+                    # No upstream slot came free; same shape as the WebSocket error frame
+                    yield format_event({
+                        "content": "⏱️ I'm currently handling too many requests. Please try again in a moment!",
+                        "reason": e.reason,
+                        "retry_after": e.retry_after,
+                    }, event="error")
+                    return
+                except Exception as e:
+                    yield format_event({"content": f"⚠️ Error: {e}"}, event="error")
+                    return
+                finally:
+                    pending = None
+                seq += 1
+                yield format_event({"content": content}, event="stream", event_id=f"{stream.stream_id}:{seq}")
+        finally:
+            if pending is not None:
+                # Client went away mid-wait; let the read unwind before closing
+                pending.cancel()
+                try:
+                    await pending
+                except BaseException:
+                    pass
+            await chunks.aclose()
+
+        yield format_event({"session_id": stream.session_id, "turn_id": stream.stream_id}, event="done", event_id=f"{stream.stream_id}:{seq}")
+
+
+sse_streams = SSEStreamRegistry(
+    max_streams=settings.CHAT_SSE_MAX_STREAMS,
+    ttl=settings.CHAT_SSE_RESUME_TTL,
+    heartbeat=settings.CHAT_SSE_HEARTBEAT,
+)
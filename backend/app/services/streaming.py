@@ -0,0 +1,160 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+# Marks the end of the upstream stream inside the queue
+_DONE = object()
+
+
+@dataclass
+class StreamStats:
+    """Per-connection counters for what actually went over the wire"""
+    chunks: int = 0   # upstream deltas received
+    frames: int = 0   # frames sent to the client
+    bytes: int = 0    # payload bytes sent to the client
+
+    def record(self, text: str, chunks: int = 1):
+        self.chunks += chunks
+        self.frames += 1
+        self.bytes += len(text.encode("utf-8"))
+
+
+class BufferedStream:
+    """Reads an upstream async stream in a background task through a bounded queue.
+
+    The producer pauses on a full queue, so a slow client stops us pulling
+    more tokens from upstream instead of buffering them in memory.
+
+    Usage:
+        async with BufferedStream(source, maxsize=64) as stream:
+            async for chunk in stream:
+                ...
+    """
+
+    def __init__(self, source: AsyncIterator[str], maxsize: int = 64):
+        self._source = source
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: asyncio.Task | None = None
+        self._error: BaseException | None = None
+        self._finished = False
+
+    async def __aenter__(self) -> "BufferedStream":
+        self._task = asyncio.create_task(self._produce())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Consumer is gone (done, disconnected or failed) - stop reading upstream
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return False
+
+    async def _produce(self):
+        try:
+            async for chunk in self._source:
+                await self._queue.put(chunk)
+        except Exception as e:
+            self._error = e
+        finally:
+            closer = getattr(self._source, "aclose", None)
+            if closer is not None:
+                try:
+                    await closer()
+                except Exception:
+                    pass
+        # Not reached on cancellation, so a full queue can't wedge shutdown
+        await self._queue.put(_DONE)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self._finished:
+            raise StopAsyncIteration
+        return self._unwrap(await self._queue.get())
+
+    def _unwrap(self, item) -> str:
+        if item is _DONE:
+            self._finished = True
+            if self._error is not None:
+                raise self._error
+            raise StopAsyncIteration
+        return item
+
+    async def batches(self, window_ms: float = 40, max_bytes: int = 512) -> AsyncIterator[tuple[str, int]]:
+        """Coalesce deltas into (text, delta_count) batches.
+
+        A batch is flushed once `window_ms` has passed since its first delta or
+        it reaches `max_bytes`, whichever comes first. A window of 0 passes
+        deltas through one by one.
+        """
+        window = window_ms / 1000
+        while True:
+            try:
+                first = await self.__anext__()
+            except StopAsyncIteration:
+                return
+
+            parts = [first]
+            size = len(first.encode("utf-8"))
+            deadline = time.monotonic() + window
+
+            while size < max_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    # Flush what we have; the next read reports end/error
+                    self._queue.put_nowait(item)
+                    break
+                parts.append(item)
+                size += len(item.encode("utf-8"))
+
+            yield "".join(parts), len(parts)
+
+
+class ReplayBuffer:
+    """Append-only chunk log that any number of readers can follow live.
+
+    Readers that join late first replay what was already produced, then
+    receive new chunks as they arrive.
+    """
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._cond = asyncio.Condition()
+
+    async def append(self, chunk: str):
+        async with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    async def finish(self, error: BaseException | None = None):
+        async with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    async def follow(self, start: int = 0) -> AsyncIterator[str]:
+        position = start
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: len(self.chunks) > position or self.done)
+            # Yield outside the lock so a slow reader never stalls the writer
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done and position >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
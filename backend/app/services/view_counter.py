@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, update
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.blog import BlogPost
+
+
+class ViewCounter:
+    """Write-behind blog post view counts.
+
+    Page views only bump an in-memory counter (sharded by post id, one lock
+    per shard); a background task periodically adds the accumulated deltas
+    to blog_posts in a single batched `views = views + ?` transaction. Reads
+    add the deltas not yet written, so counts stay current. Each worker
+    keeps its own counter - the increments are additive, so they combine.
+    """
+
+    def __init__(self, shards: int, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._shards = [defaultdict(int) for _ in range(max(1, shards))]
+        self._locks = [threading.Lock() for _ in self._shards]
+        # Deltas taken out of the shards but not committed yet
+        self._in_flight: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Bound to the event loop that uses it - created per start()/stop() cycle
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    def _shard(self, post_id: int) -> int:
+        return post_id % len(self._shards)
+
+    def incr(self, post_id: int, amount: int = 1):
+        shard = self._shard(post_id)
+        with self._locks[shard]:
+            self._shards[shard][post_id] += amount
+
+    def pending(self, post_id: int) -> int:
+        shard = self._shard(post_id)
+        with self._locks[shard]:
+            buffered = self._shards[shard].get(post_id, 0)
+        return buffered + self._in_flight.get(post_id, 0)
+
+    def views(self, post_id: int, stored: Optional[int]) -> int:
+        """Stored count plus the views not flushed yet"""
+        return (stored or 0) + self.pending(post_id)
+
+    def discard(self, post_id: int):
+        """Forget pending views of a deleted post"""
+        shard = self._shard(post_id)
+        with self._locks[shard]:
+            self._shards[shard].pop(post_id, None)
+
+    def _drain(self) -> Dict[int, int]:
+        deltas: Dict[int, int] = {}
+        for index, lock in enumerate(self._locks):
+            with lock:
+                shard, self._shards[index] = self._shards[index], defaultdict(int)
+            deltas.update(shard)
+        return deltas
+
+    async def flush(self):
+        """Write the accumulated deltas; on failure they go back to the counter"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            deltas = self._drain()
+            if not deltas:
+                return
+            self._in_flight = deltas
+            try:
+                await asyncio.to_thread(self._write, deltas)
+            except Exception as e:
+                print(f"❌ Blog view flush failed ({len(deltas)} posts, retrying next run): {e}")
+                for post_id, amount in deltas.items():
+                    self.incr(post_id, amount)
+            finally:
+                self._in_flight = {}
+
+    @staticmethod
+    def _write(deltas: Dict[int, int]):
+        table = BlogPost.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("post_id"))
+            .values(views=func.coalesce(table.c.views, 0) + bindparam("delta"))
+        )
+        with SessionLocal() as db:
+            # One executemany, one transaction for every post viewed since the last flush
+            db.execute(stmt, [{"post_id": post_id, "delta": amount} for post_id, amount in deltas.items()])
+            db.commit()
+
+    def start(self):
+        if self._task is None:
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            self._flush_lock = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so stop() can't abandon a write halfway; its own flush waits for this one
+            await asyncio.shield(self.flush())
+
+
+view_counter = ViewCounter(
+    shards=settings.BLOG_VIEW_SHARDS,
+    flush_interval=settings.BLOG_VIEW_FLUSH_INTERVAL,
+)
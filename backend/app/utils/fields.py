@@ -0,0 +1,38 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import load_only
+
+
+class FieldSet:
+    """Response fields of a list endpoint and the columns each one reads.
+
+    Lets a list query load only the columns it serializes (everything else,
+    like long text bodies, stays unloaded) and backs the `fields=` parameter.
+    Renderers must only touch the columns they declare - other attributes
+    aren't loaded, and loading them lazily fails under asyncio.
+    """
+
+    def __init__(self, fields: Dict[str, Tuple[Sequence[Any], Callable[[Any], Any]]]):
+        self.fields = fields
+
+    def parse(self, requested: Optional[str]) -> List[str]:
+        """Names from a comma-separated `fields=` value (all fields when empty)"""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.fields)}",
+            )
+        return names or list(self.fields)
+
+    def load(self, names: Sequence[str]):
+        """Loader option restricting the query to the columns `names` need"""
+        columns = {column for name in names for column in self.fields[name][0]}
+        return load_only(*columns)
+
+    def render(self, obj: Any, names: Sequence[str]) -> Dict[str, Any]:
+        return {name: self.fields[name][1](obj) for name in names}
@@ -7,6 +7,8 @@ sys.path.append(str(Path(__file__).parent))
 from app.database import Base, engine
 from app.models.project import Project
 from app.models.chat_message import ChatMessage
+from app.models.llm_usage import LLMUsage
+from app.models.chat_rollup import ChatRollup
 from app.models.resume import ResumeData  # Add this import
 
 def init_database():
@@ -0,0 +1,133 @@
+"""
+Simple concurrent load test for the chat endpoints.
+
+Run the API against the offline stub provider, with the limits that would
+otherwise shed or short-circuit the load raised or disabled:
+    CHAT_PROVIDER=stub STUB_LATENCY_MS=400 \
+    CHAT_IP_RATE=1000 CHAT_IP_BURST=1000 \
+    CHAT_SESSION_RATE=1000 CHAT_SESSION_BURST=1000 \
+    CHAT_MAX_CONCURRENT=1000 CHAT_CACHE_SIZE=0 \
+    uvicorn app.main:app
+then:
+    python load_test_chat.py --clients 50 --messages 5
+
+Every client sends its own prompts, so single-flight never merges them.
+Keep CHAT_MAX_CONCURRENT at its default to measure admission control instead.
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+import websockets
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def question(session_id, i):
+    # Unique per client, so the response cache and single-flight can't answer it
+    return f"load test question {i} from {session_id}"
+
+
+def rejection(response):
+    """Error bucket for a non-200 reply, e.g. '429 session_rate' or '503'"""
+    try:
+        detail = response.json().get("detail", "")
+    except ValueError:
+        detail = ""
+    reason = re.search(r"\((\w+)\)", detail) if response.status_code == 429 else None
+    return f"{response.status_code} {reason.group(1)}" if reason else str(response.status_code)
+
+
+async def rest_client(base_url, messages, latencies, errors):
+    session_id = str(uuid.uuid4())
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for i in range(messages):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/chat/message", json={
+                    "message": question(session_id, i),
+                    "session_id": session_id,
+                })
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            if response.status_code != 200:
+                errors[rejection(response)] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+async def ws_client(ws_url, messages, latencies, first_tokens, errors):
+    session_id = str(uuid.uuid4())
+    async with websockets.connect(f"{ws_url}/api/chat/ws/{session_id}") as ws:
+        for i in range(messages):
+            start = time.perf_counter()
+            first = None
+            await ws.send(json.dumps({"message": question(session_id, i)}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] == "stream" and first is None:
+                    first = time.perf_counter() - start
+                if frame["type"] == "error":
+                    errors[f"rejected {frame.get('reason', 'unknown')}"] += 1
+                    break
+                if frame["type"] == "done":
+                    latencies.append(time.perf_counter() - start)
+                    first_tokens.append(first or 0.0)
+                    break
+
+
+def report(name, latencies, errors, total_time, first_tokens=None):
+    print(f"\n📊 {name}: {len(latencies)} ok, {sum(errors.values())} rejected/failed in {total_time:.2f}s")
+    for reason, count in errors.most_common():
+        print(f"  {reason}: {count}")
+    if latencies:
+        print(f"  latency  p50={percentile(latencies, 50) * 1000:.0f}ms "
+              f"p95={percentile(latencies, 95) * 1000:.0f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.0f}ms "
+              f"mean={statistics.mean(latencies) * 1000:.0f}ms")
+    if first_tokens:
+        print(f"  first token p50={percentile(first_tokens, 50) * 1000:.0f}ms "
+              f"p95={percentile(first_tokens, 95) * 1000:.0f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Chat endpoint load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--mode", choices=["rest", "ws", "both"], default="both")
+    args = parser.parse_args()
+
+    if args.mode in ("rest", "both"):
+        latencies, errors = [], Counter()
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            rest_client(args.url, args.messages, latencies, errors) for _ in range(args.clients)
+        ])
+        report("REST /api/chat/message", latencies, errors, time.perf_counter() - start)
+
+    if args.mode in ("ws", "both"):
+        ws_url = args.url.replace("http", "ws", 1)
+        latencies, first_tokens, errors = [], [], Counter()
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            ws_client(ws_url, args.messages, latencies, first_tokens, errors) for _ in range(args.clients)
+        ])
+        report("WebSocket /api/chat/ws", latencies, errors, time.perf_counter() - start, first_tokens)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
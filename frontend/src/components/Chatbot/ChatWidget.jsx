@@ -9,6 +9,7 @@ const ChatWidget = () => {
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [retryAt, setRetryAt] = useState(0); // ms timestamp from the server's Retry-After
   const [sessionId] = useState(() => `session-${Date.now()}`);
   const [botPosition, setBotPosition] = useState({ x: 0, y: 0 });
   const [currentMood, setCurrentMood] = useState('happy');
@@ -165,6 +166,17 @@ const ChatWidget = () => {
   const sendMessage = async () => {
     if (!inputMessage.trim()) return;
 
+    // Rate limited: hold the message instead of sending a request that will be rejected
+    const waitSeconds = Math.ceil((retryAt - Date.now()) / 1000);
+    if (waitSeconds > 0) {
+      setMessages(prev => [...prev, {
+        role: 'assistant',
+        content: `⏱️ Please wait ${waitSeconds}s before sending another message.`,
+        timestamp: new Date().toLocaleTimeString()
+      }]);
+      return;
+    }
+
     soundManager.playClick();
 
     // Track chat message sent (NEW)
@@ -194,11 +206,23 @@ const ChatWidget = () => {
         })
       });
 
-      const data = await response.json();
+      const data = await response.json().catch(() => ({}));
+
+      let content = data.response;
+      if (!response.ok) {
+        // 429 (rate limited / busy) and 503 (chat unavailable) carry a detail message
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+        if (retryAfter > 0) {
+          setRetryAt(Date.now() + retryAfter * 1000);
+        }
+        content = response.status === 429 && retryAfter > 0
+          ? `⏱️ EmpireBot is handling too many messages right now. Try again in ${retryAfter}s.`
+          : `⏱️ ${data.detail || 'The assistant is unavailable right now.'}`;
+      }
 
       const botMessage = {
         role: 'assistant',
-        content: data.response,
+        content,
         timestamp: new Date().toLocaleTimeString()
       };
 
@@ -33,7 +33,7 @@ const BlogPost = () => {
 
   const fetchPost = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/blog/posts/${slug}`);
+      const response = await fetch(`${API_URL}/api/blog/posts/${slug}?format=html`);
       const data = await response.json();
       setPost(data);
     } catch (error) {
@@ -498,7 +498,7 @@ const BlogPost = () => {
                 lineHeight: '1.8'
               }}
             >
-              <div dangerouslySetInnerHTML={{ __html: post.content.replace(/\n/g, '<br/>') }} />
+              <div dangerouslySetInnerHTML={{ __html: post.content_html }} />
             </motion.div>
 
             {/* Tags */}